@@ -1,22 +1,71 @@
-import logfire
+import os
+import json
+import hashlib
+import asyncio
+import functools
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
 from pathlib import Path
-from pydantic import ValidationError
-from pydantic_ai import Agent, BinaryContent
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, List, Literal, Optional, Tuple
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Instrumentation ---
+# Logfire, and with it the pydantic-ai instrumentation, is only imported when
+# enabled: RESUME_LOGFIRE=1, or by default when LOGFIRE_TOKEN is set. Log
+# records are forwarded to it; otherwise they go to standard logging.
+def _logfire_enabled() -> bool:
+    setting = os.getenv('RESUME_LOGFIRE')
+    if setting is None:
+        return bool(os.getenv('LOGFIRE_TOKEN'))
+    return setting.lower() in ('1', 'true', 'yes')
+
+if _logfire_enabled():
+    import logfire
+
+    logfire.configure()
+    logfire.instrument_pydantic_ai()
+    logging.getLogger().addHandler(logfire.LogfireLoggingHandler())
+else:
+    # Logfire's pydantic plugin would import it anyway as soon as the first
+    # model class is defined, so it is switched off before pydantic loads
+    os.environ.setdefault('PYDANTIC_DISABLE_PLUGINS', 'logfire-plugin')
+
+from pydantic import ValidationError
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
 # Load models and prompts
 from models import JobRequirements, CVAnalysis, MatchingScore
 from prompts import *
+from cache import ResultCache
+from matching import local_match
+from ranking import CandidateIndex
+from dedup import Fingerprint, MinHashIndex, Signature
+from store import analysis_id, create_store_from_env
+from analytics import create_score_log_from_env
+from pdf_text import extract_text
+from incremental import (
+    MAX_CHANGED_SHARE, PartDiff, Snapshot, cv_update_prompt, diff, job_update_prompt, merge_cv,
+    split_requirements, split_sections,
+)
+from metrics import metrics, record_cache_stats, record_usage, stage
+from singleflight import SingleFlight
+from jobs import JobQueue
+from routing import create_router_from_env
+from policy import Overloaded, PolicyError, create_policy_from_env, is_transient, retry_after_header
 
-# Load environment variables
-load_dotenv()
-
-# Configure logfire logging
-logfire.configure()
-logfire.instrument_pydantic_ai()
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
 
 # --- Agent Definitions ---
 # Configure model settings with temperature=0.3 for more focused, deterministic outputs
@@ -25,77 +74,1011 @@ model_settings = {
     'max_tokens': 2000    # Ensure we have enough tokens for detailed responses
 }
 
-# Define agents with their respective models and prompts
-job_requirements_agent = Agent(
-    'openai:gpt-4o-mini',
-    output_type=JobRequirements,
-    system_prompt=job_requirements_prompt,
-    model_settings=model_settings
-)
+MODEL_NAME = 'openai:gpt-4o-mini'
 
-cv_review_agent = Agent(
-    'openai:gpt-4o-mini',
-    output_type=CVAnalysis,
-    system_prompt=cv_review_prompt,
-    model_settings=model_settings
-)
+# How often the model may retry after its output fails validation
+OUTPUT_RETRIES = int(os.getenv('RESUME_OUTPUT_RETRIES', '1'))
+
+# Output type and system prompt per agent. Agents are built on first use, so
+# starting the API does not load pydantic-ai and the model providers.
+AGENT_SPECS = {
+    'job_requirements': (JobRequirements, job_requirements_prompt),
+    'cv_review': (CVAnalysis, cv_review_prompt),
+    'scoring': (MatchingScore, scoring_prompt),
+}
+
+@functools.cache
+def get_agent(name: str) -> 'Agent':
+    """
+    The agent for an AGENT_SPECS entry, built on first use
+    """
+    from pydantic_ai import Agent
+
+    output_type, system_prompt = AGENT_SPECS[name]
+    return Agent(
+        MODEL_NAME,
+        output_type=output_type,
+        system_prompt=system_prompt,
+        model_settings=model_settings,
+        output_retries=OUTPUT_RETRIES
+    )
 
-scoring_agent = Agent(
-    'openai:gpt-4o-mini',
-    output_type=MatchingScore,
-    system_prompt=scoring_prompt,
-    model_settings=model_settings
+def __getattr__(name: str):
+    # job_requirements_agent, cv_review_agent and scoring_agent are still
+    # available as module attributes
+    if name.endswith('_agent') and name[:-len('_agent')] in AGENT_SPECS:
+        return get_agent(name[:-len('_agent')])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Model tiers per call, cheapest first (see routing.py); without
+# configuration every call uses MODEL_NAME
+router = create_router_from_env(MODEL_NAME)
+
+# Returns False for outputs that should be retried on a stronger tier
+ConfidenceCheck = Callable[[BaseModel], bool]
+
+# Concurrency budget, deadlines, retries and circuit breakers for every model call
+policy = create_policy_from_env()
+
+# --- Result Cache ---
+# Shared on-disk cache so repeated analyses are served without a model call,
+# across restarts and across all uvicorn workers on the host
+result_cache = ResultCache(
+    os.getenv('RESUME_CACHE_PATH', '.cache/results.sqlite3'),
+    max_entries=int(os.getenv('RESUME_CACHE_MAX_ENTRIES', '5000')),
+    ttl_seconds=float(os.getenv('RESUME_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
 )
 
-# --- Core Functions ---
-async def analyze_job_vacancy(vacancy_text: str) -> JobRequirements:
+def _prompt_key_parts(user_prompt, attachment_id: Optional[str] = None) -> list:
+    """
+    Flatten a user prompt (text and binary parts) into cache key parts. With
+    attachment_id (the content hash of the prompt's attachment) the hash
+    stands in for the attachment bytes, so they are not hashed again.
+    """
+    from pydantic_ai import BinaryContent
+
+    parts = user_prompt if isinstance(user_prompt, list) else [user_prompt]
+    key_parts = []
+    for part in parts:
+        if isinstance(part, BinaryContent):
+            key_parts.extend([part.media_type, attachment_id or part.data])
+        else:
+            key_parts.append(part)
+    return key_parts
+
+def _cache_key(namespace: str, system_prompt: str, user_prompt, attachment_id: Optional[str] = None) -> str:
+    return ResultCache.make_key(
+        namespace, router.signature, system_prompt, model_settings, *_prompt_key_parts(user_prompt, attachment_id)
+    )
+
+def _prompt_size(user_prompt) -> Tuple[int, bool]:
+    """
+    Input size for routing: (characters plus attachment bytes, has attachments)
     """
-    Extract requirements from job vacancy text
+    parts = _prompt_key_parts(user_prompt)
+    return sum(len(part) for part in parts), any(isinstance(part, bytes) for part in parts)
+
+def _failure_outcome(error: Exception) -> Optional[str]:
+    """
+    Routing outcome for a failed tier, or None if a stronger tier would not help
+    """
+    from pydantic_ai.exceptions import UnexpectedModelBehavior
+
+    if isinstance(error, (UnexpectedModelBehavior, ValidationError)):
+        return 'invalid'
+    if (isinstance(error, PolicyError) and not isinstance(error, Overloaded)) or is_transient(error):
+        return 'failed'
+    return None
+
+async def _routed_run(namespace: str, agent: 'Agent', user_prompt, check: Optional[ConfidenceCheck], tiers=None):
+    """
+    Run an agent on the planned model tiers, moving to the next tier when the
+    output fails validation or the confidence check, or the tier is unavailable
+    """
+    tiers = tiers or router.plan(namespace, *_prompt_size(user_prompt))
+    for position, tier in enumerate(tiers):
+        last = position == len(tiers) - 1
+        start = time.perf_counter()
+        try:
+            with stage('model_call', namespace):
+                result = await policy.call(namespace, tier.label, lambda: agent.run(user_prompt, model=tier.model))
+        except Exception as e:
+            outcome = _failure_outcome(e)
+            if outcome is None:
+                raise
+            router.record(namespace, tier, outcome, time.perf_counter() - start)
+            if last:
+                raise
+            continue
+        record_usage(namespace, tier.label, result.usage())
+        if not last and check is not None and not check(result.output):
+            router.record(namespace, tier, 'escalated', time.perf_counter() - start)
+            continue
+        router.record(namespace, tier, 'accepted', time.perf_counter() - start)
+        return result.output
+
+# Identical analyses that are already running are joined instead of repeated.
+# RESUME_SINGLEFLIGHT_LOCK_DIR extends this to all workers on the host: they
+# wait on a per-key lock file and then read the result from the shared cache.
+inflight = SingleFlight(os.getenv('RESUME_SINGLEFLIGHT_LOCK_DIR') or None)
+
+async def _run_and_store(
+    namespace: str,
+    agent: 'Agent',
+    output_type: type[BaseModel],
+    key: str,
+    user_prompt,
+    check: Optional[ConfidenceCheck] = None,
+):
+    if inflight.lock_dir is not None:
+        # Another worker may have finished the same call while we held off
+        cached = result_cache.get(key, namespace, count=False)
+        if cached is not None:
+            metrics.inc('resume_singleflight_shared_total', agent=namespace, scope='host')
+            return output_type.model_validate_json(cached)
+    output = await _routed_run(namespace, agent, user_prompt, check)
+    with stage('cache_store', namespace):
+        await asyncio.to_thread(result_cache.set, key, output.model_dump_json(), namespace)
+    return output
+
+async def _cached_run(
+    namespace: str,
+    agent: 'Agent',
+    output_type: type[BaseModel],
+    system_prompt: str,
+    user_prompt,
+    check: Optional[ConfidenceCheck] = None,
+    attachment_id: Optional[str] = None,
+):
+    """
+    Run an agent, serving the output from the result cache when the same
+    model, prompts and settings have been seen before, and sharing one model
+    call between concurrent identical requests
+    """
+    with stage('cache_lookup', namespace):
+        key = _cache_key(namespace, system_prompt, user_prompt, attachment_id)
+        cached = result_cache.get(key, namespace)
+    if cached is not None:
+        with stage('validation', namespace):
+            return output_type.model_validate_json(cached)
+    if key in inflight:
+        metrics.inc('resume_singleflight_shared_total', agent=namespace, scope='process')
+    return await inflight.do(key, lambda: _run_and_store(namespace, agent, output_type, key, user_prompt, check))
+
+async def _streamed_run(
+    namespace: str,
+    agent: 'Agent',
+    output_type: type[BaseModel],
+    system_prompt: str,
+    user_prompt,
+    check: Optional[ConfidenceCheck] = None,
+    attachment_id: Optional[str] = None,
+):
+    """
+    Stream an agent's structured output, yielding (output, is_final) as fields
+    get filled in. Cache hits, and requests that join an identical call already
+    in flight, yield only the final output. Only the first model tier is
+    streamed; if it has to escalate, the final output comes from a later tier.
+    """
+    with stage('cache_lookup', namespace):
+        key = _cache_key(namespace, system_prompt, user_prompt, attachment_id)
+        cached = result_cache.get(key, namespace)
+    if cached is not None:
+        with stage('validation', namespace):
+            output = output_type.model_validate_json(cached)
+        yield output, True
+        return
+    if key in inflight:
+        metrics.inc('resume_singleflight_shared_total', agent=namespace, scope='process')
+        output = await inflight.join(key)
+        if output is not None:
+            yield output, True
+            return
+    async with inflight.lead(key) as flight:
+        tier, *stronger = router.plan(namespace, *_prompt_size(user_prompt))
+        start = time.perf_counter()
+        try:
+            # Streams get a concurrency slot, the circuit breaker and the call
+            # deadline but no retries; failures fall back to a regular call below
+            async with policy.guard(namespace, tier.label):
+                # Covers the whole stream, including time the consumer spends on partials
+                with stage('model_call', namespace):
+                    # The deadline wraps each await rather than the whole block,
+                    # since a timeout scope must not stay open across a yield
+                    deadline = asyncio.get_running_loop().time() + policy.timeout
+                    try:
+                        async with AsyncExitStack() as stack:
+                            async with asyncio.timeout_at(deadline):
+                                result = await stack.enter_async_context(
+                                    agent.run_stream(user_prompt, model=tier.model)
+                                )
+                            messages = result.stream_structured(debounce_by=0.1)
+                            stack.push_async_callback(messages.aclose)
+                            while True:
+                                async with asyncio.timeout_at(deadline):
+                                    message, last = await anext(messages, (None, True))
+                                if last:
+                                    break
+                                try:
+                                    partial = await result.validate_structured_output(message, allow_partial=True)
+                                except ValidationError:
+                                    # Required fields have not arrived yet
+                                    continue
+                                yield partial, False
+                            async with asyncio.timeout_at(deadline):
+                                output = await result.get_output()
+                    except TimeoutError:
+                        metrics.inc('resume_policy_events_total', agent=namespace, event='timeout')
+                        raise
+            record_usage(namespace, tier.label, result.usage())
+            outcome = 'escalated' if stronger and check is not None and not check(output) else 'accepted'
+            fallback = stronger
+        except Exception as e:
+            outcome = _failure_outcome(e)
+            # Transient errors are retried on the same tier if there is no stronger one
+            fallback = stronger or ([tier] if is_transient(e) else [])
+            if outcome is not None:
+                router.record(namespace, tier, outcome, time.perf_counter() - start)
+            if outcome is None or not fallback:
+                raise
+        if outcome == 'accepted':
+            router.record(namespace, tier, outcome, time.perf_counter() - start)
+        else:
+            if outcome == 'escalated':
+                router.record(namespace, tier, outcome, time.perf_counter() - start)
+            output = await _routed_run(namespace, agent, user_prompt, check, fallback)
+        with stage('cache_store', namespace):
+            await asyncio.to_thread(result_cache.set, key, output.model_dump_json(), namespace)
+        flight.set_result(output)
+    yield output, True
+
+# --- Analysis Store ---
+# Analyses are kept by content-addressed ID so summaries can be served
+# per CV without re-analysis (backend selected by RESUME_STORE_BACKEND)
+analysis_store = create_store_from_env()
+
+# Every analyzed CV is indexed for vectorized ranking against vacancies
+candidate_index = CandidateIndex()
+
+# --- Score Analytics ---
+# Every score served by the API is appended to a columnar log for aggregate
+# queries (None when disabled or pyarrow is missing)
+score_log = create_score_log_from_env()
+
+def _analysis_ref(fields: dict, analysis: BaseModel) -> str:
+    """The analysis_id the client got back with the analysis, or the content ID of the analysis itself"""
+    return fields.get('analysis_id') or analysis_id(analysis.model_dump_json())
+
+def _log_score(cv_id: str, job_id: str, result: MatchingScore, mode: str) -> None:
+    if score_log is not None:
+        score_log.append(cv_id, job_id, result, mode)
+
+# --- Prompts and Post-processing ---
+def _job_prompt(vacancy_text: str) -> str:
+    return f"Extract the job requirements and any other relevant information from the vacancy text: {vacancy_text}"
+
+# 'pdf' sends the raw PDF to the model; 'text' extracts compact text locally
+# first, which cuts the request payload and input tokens
+CVInputMode = Literal['pdf', 'text']
+DEFAULT_CV_INPUT_MODE: CVInputMode = os.getenv('RESUME_CV_INPUT_MODE', 'pdf')
+
+CV_INSTRUCTION = "Analyze the CV and provide a detailed breakdown of strengths, weaknesses, and improvement recommendations."
+
+async def _cv_prompt(
+    source: Path | bytes, input_mode: Optional[CVInputMode] = None, digest: Optional[str] = None
+) -> Tuple[str, list]:
+    """
+    Build the CV review prompt, returning (content hash of the PDF, prompt).
+    A digest the caller already computed is used instead of hashing again.
+    """
+    if (input_mode or DEFAULT_CV_INPUT_MODE) == 'text':
+        # PDF parsing is CPU-bound; keep it off the event loop
+        with stage('text_extraction', 'cv_review'):
+            cv_id, text = await asyncio.to_thread(extract_text, source, result_cache, digest)
+        return cv_id, [CV_INSTRUCTION, f"CV text:\n{text}"]
+    from pydantic_ai import BinaryContent
+
+    with stage('file_read', 'cv_review'):
+        data = source if isinstance(source, bytes) else source.read_bytes()
+    return digest or analysis_id(data), [CV_INSTRUCTION, BinaryContent(data=data, media_type='application/pdf')]
+
+def _score_prompt(cv_analysis: CVAnalysis, job_requirements: JobRequirements) -> str:
+    # Compact encodings instead of the model reprs keep input tokens down
+    return (
+        "Provide a score between 0 and 100 based on how well the CV matches the job requirements.\n"
+        f"CV:\n{cv_analysis.to_prompt()}\n"
+        f"Job requirements:\n{job_requirements.to_prompt()}"
+    )
+
+# --- Incremental Updates ---
+# Each analysis keeps a snapshot of its document's parts (CV sections or
+# vacancy requirement items). A new version that names its predecessor via
+# previous_id is diffed against it, and only the changed parts are sent to the
+# model together with the previous analysis.
+def _snapshot_id(analysis_id: str) -> str:
+    # Snapshots get their own IDs; the SQLite store keys entries by ID alone
+    return f"{analysis_id}:parts"
+
+def _count_incremental(agent: str, outcome: str) -> None:
+    metrics.inc('resume_incremental_total', agent=agent, outcome=outcome)
+
+async def _cv_sections(source: Path | bytes, digest: Optional[str] = None) -> Optional[Tuple[str, Snapshot]]:
+    """
+    (content hash, section snapshot) of a CV, or None if its text cannot be extracted
     """
     try:
-        result = await job_requirements_agent.run(
-            f"Extract the job requirements and any other relevant information from the vacancy text: {vacancy_text}"
+        digest, text = await asyncio.to_thread(extract_text, source, result_cache, digest)
+    except Exception:
+        return None
+    return (digest, split_sections(text)) if text else None
+
+def _cv_update(
+    previous_id: str, extracted: Optional[Tuple[str, Snapshot]]
+) -> Optional[Tuple[str, Optional[str], CVAnalysis, PartDiff]]:
+    """
+    Diff a re-uploaded CV against its previous version. Returns (content hash,
+    update prompt or None if nothing changed, previous analysis, changes), or
+    None if the CV has to be analyzed from scratch.
+    """
+    previous = analysis_store.get('cv', previous_id, CVAnalysis)
+    baseline = analysis_store.get('cv_sections', _snapshot_id(previous_id), Snapshot)
+    if extracted is None or previous is None or baseline is None:
+        _count_incremental('cv_review', 'full')
+        return None
+    digest, sections = extracted
+    changes = diff(baseline, sections)
+    if changes.share_of(baseline) > MAX_CHANGED_SHARE:
+        # Mostly rewritten, or a different CV altogether
+        _count_incremental('cv_review', 'full')
+        return None
+    _count_incremental('cv_review', 'partial' if changes else 'unchanged')
+    return digest, cv_update_prompt(previous, changes) if changes else None, previous, changes
+
+def _job_update(vacancy_text: str, previous_id: Optional[str]) -> Tuple[Snapshot, Optional[str], Optional[JobRequirements]]:
+    """
+    Split a vacancy into requirement items and diff it against its previous
+    version. Returns (snapshot, prompt, previous requirements): the prompt is
+    None if nothing changed, and a full extraction prompt without a usable
+    previous version.
+    """
+    snapshot = split_requirements(vacancy_text)
+    if previous_id is None:
+        return snapshot, _job_prompt(vacancy_text), None
+    previous = analysis_store.get('job', previous_id, JobRequirements)
+    baseline = analysis_store.get('job_items', _snapshot_id(previous_id), Snapshot)
+    changes = diff(baseline, snapshot) if baseline is not None else None
+    if previous is None or changes is None or changes.share_of(baseline) > MAX_CHANGED_SHARE:
+        _count_incremental('job_requirements', 'full')
+        return snapshot, _job_prompt(vacancy_text), None
+    _count_incremental('job_requirements', 'partial' if changes else 'unchanged')
+    return snapshot, job_update_prompt(previous, changes) if changes else None, previous
+
+# Section extractions still running after their analysis was returned
+_pending_sections: set = set()
+
+# Store writes go through a worker thread: with a large SQLite store a write
+# (and the eviction it may trigger) should not hold up the event loop
+async def _remember_cv(cv_id: str, cv_analysis: CVAnalysis, sections: Optional[asyncio.Future] = None) -> None:
+    # Keep the analysis by content hash for summaries and ranking
+    await asyncio.to_thread(analysis_store.put, 'cv', cv_id, cv_analysis)
+    candidate_index.add(cv_id, cv_analysis)
+    if sections is None:
+        return
+
+    async def store_sections() -> None:
+        extracted = await sections
+        if extracted is not None:
+            await asyncio.to_thread(analysis_store.put, 'cv_sections', _snapshot_id(cv_id), extracted[1])
+
+    # The snapshot is only needed for the next version of the CV, so the
+    # response does not wait for PDF parsing
+    task = asyncio.ensure_future(store_sections())
+    _pending_sections.add(task)
+    task.add_done_callback(_pending_sections.discard)
+
+async def _remember_job(job_id: str, job_requirements: JobRequirements, snapshot: Snapshot) -> None:
+    def put() -> None:
+        analysis_store.put('job', job_id, job_requirements)
+        analysis_store.put('job_items', _snapshot_id(job_id), snapshot)
+
+    await asyncio.to_thread(put)
+
+# --- Near-duplicate Reuse ---
+# Reposted vacancies and re-exported CVs differ from an analyzed input only by
+# trivial wording, which exact hashes miss. A MinHash index over analyzed
+# texts finds them: 'reuse' returns the stored analysis and keeps it under the
+# new input's ID as well, 'offer' returns it under the original ID so the
+# client can accept it or re-request with 'off'. Shingle similarity cannot tell
+# a reworded posting from one whose requirements changed ("Python" -> "Java"),
+# so offering is the default and silent reuse is opt-in.
+DedupMode = Literal['reuse', 'offer', 'off']
+DEFAULT_DEDUP_MODE: DedupMode = os.getenv('RESUME_DEDUP_MODE', 'offer')
+
+similarity_index = {
+    kind: MinHashIndex(threshold=float(os.getenv('RESUME_DEDUP_THRESHOLD', '0.8')))
+    for kind in ('job', 'cv')
+}
+
+# Signatures get their own store, sized for 100k documents of each kind, so
+# they neither crowd out analyses nor get evicted by them
+fingerprint_store = create_store_from_env('FINGERPRINT_STORE', '.cache/fingerprints.sqlite3', 250000)
+
+@dataclass
+class NearDuplicate:
+    """A stored analysis of a near-identical input."""
+    analysis_id: str
+    similarity: float
+    analysis: BaseModel
+
+def _fingerprint_id(analysis_id: str) -> str:
+    return f"{analysis_id}:minhash"
+
+async def _index_signature(kind: str, doc_id: str, signature: Optional[Signature]) -> None:
+    if signature is None or doc_id in similarity_index[kind]:
+        return
+    similarity_index[kind].add(doc_id, signature)
+    await asyncio.to_thread(
+        fingerprint_store.put, f'{kind}_minhash', _fingerprint_id(doc_id), Fingerprint.of(signature)
+    )
+
+def _near_duplicate(
+    kind: str, doc_id: str, signature: Optional[Signature], output_type: type[BaseModel], mode: DedupMode
+) -> Optional[NearDuplicate]:
+    if mode == 'off' or signature is None or doc_id in similarity_index[kind]:
+        # Exact repeats are served by the result cache
+        return None
+    for match_id, similarity in similarity_index[kind].matches(signature, exclude=doc_id):
+        analysis = analysis_store.get(kind, match_id, output_type)
+        if analysis is not None:
+            metrics.inc('resume_near_duplicate_total', kind=kind, mode=mode)
+            return NearDuplicate(match_id, similarity, analysis)
+        # The analysis has expired from the store; try the next match, and
+        # drop this one so later lookups skip it
+        similarity_index[kind].remove(match_id)
+    return None
+
+def _reuse_only(mode: DedupMode) -> DedupMode:
+    # The core functions return a bare analysis with no way to say it belongs
+    # to another input, so they act on 'reuse' only; offers are made by the API
+    return mode if mode == 'reuse' else 'off'
+
+async def _similar_job(
+    vacancy_text: str, job_id: str, previous_id: Optional[str], mode: DedupMode
+) -> Tuple[Optional[Signature], Optional[NearDuplicate]]:
+    """
+    Signature of a vacancy and the stored analysis of a near-identical one, if
+    any. Revisions of a known vacancy (previous_id) go the incremental way.
+    """
+    signature = similarity_index['job'].signature(vacancy_text)
+    similar = None if previous_id else _near_duplicate('job', job_id, signature, JobRequirements, mode)
+    if similar is not None and mode == 'reuse':
+        await _remember_job(job_id, similar.analysis, split_requirements(vacancy_text))
+        await _index_signature('job', job_id, signature)
+    return signature, similar
+
+async def _similar_cv(
+    source: Path | bytes,
+    input_mode: Optional[CVInputMode],
+    previous_id: Optional[str],
+    mode: DedupMode,
+    digest: Optional[str] = None,
+) -> Tuple[Optional[Signature], Optional[NearDuplicate]]:
+    """
+    The same for a CV. Only text mode has the CV text at hand; in PDF mode the
+    exact content hash is all that is checked.
+    """
+    if previous_id or (input_mode or DEFAULT_CV_INPUT_MODE) != 'text':
+        return None, None
+    try:
+        digest, text = await asyncio.to_thread(extract_text, source, result_cache, digest)
+    except Exception:
+        return None, None
+    signature = similarity_index['cv'].signature(text)
+    similar = _near_duplicate('cv', digest, signature, CVAnalysis, mode)
+    if similar is not None and mode == 'reuse':
+        await _remember_cv(digest, similar.analysis)
+        await _index_signature('cv', digest, signature)
+    return signature, similar
+
+def _with_provisional_overlaps(partial: MatchingScore, provisional: MatchingScore) -> MatchingScore:
+    # While the model's output streams in, overlaps it has not produced yet
+    # are shown from the local estimate; the final score is the model's own
+    return partial.model_copy(update={
+        field: getattr(provisional, field)
+        for field in ('matched_skills', 'matched_languages', 'matched_qualifications')
+        if not getattr(partial, field)
+    })
+
+def _job_confident(output: JobRequirements) -> bool:
+    return bool(output.skills or output.responsibilities) and bool(output.experience.strip())
+
+def _cv_confident(output: CVAnalysis) -> bool:
+    return bool(output.skills) and bool(output.experience_summary.strip())
+
+def _score_check(provisional: MatchingScore) -> ConfidenceCheck:
+    """
+    Scores must be in range, come with feedback and stay near the local estimate
+    """
+    def confident(output: MatchingScore) -> bool:
+        scores = (output.overall_score, output.skills_match, output.experience_match)
+        return (
+            all(0 <= score <= 100 for score in scores)
+            and bool(output.detailed_feedback.strip())
+            and abs(output.overall_score - provisional.overall_score) <= 40
         )
-        return result.output
+    return confident
+
+# --- Core Functions ---
+async def analyze_job_vacancy(
+    vacancy_text: str,
+    job_id: Optional[str] = None,
+    previous_id: Optional[str] = None,
+    near_duplicates: DedupMode = DEFAULT_DEDUP_MODE,
+) -> JobRequirements:
+    """
+    Extract requirements from job vacancy text. With previous_id (the ID of an
+    earlier version of the vacancy) only the edited requirements are re-extracted;
+    with near_duplicates='reuse' a near-duplicate of an analyzed vacancy gets
+    its stored requirements.
+    """
+    try:
+        job_id = job_id or analysis_id(vacancy_text)
+        signature, similar = await _similar_job(vacancy_text, job_id, previous_id, _reuse_only(near_duplicates))
+        if similar is not None:
+            return similar.analysis
+        snapshot, user_prompt, previous = _job_update(vacancy_text, previous_id)
+        if user_prompt is None:
+            output = previous
+        else:
+            output = await _cached_run(
+                'job_requirements',
+                get_agent('job_requirements'),
+                JobRequirements,
+                job_requirements_prompt,
+                user_prompt,
+                _job_confident,
+            )
+        await _remember_job(job_id, output, snapshot)
+        await _index_signature('job', job_id, signature)
+        return output
     except ValidationError as e:
-        logfire.error(f"Validation error in analyze_job_vacancy: {e}")
+        logger.error(f"Validation error in analyze_job_vacancy: {e}")
         raise
 
-async def analyze_cv(pdf_path: Path) -> CVAnalysis:
+async def _cv_request(
+    source: Path | bytes,
+    input_mode: Optional[CVInputMode],
+    previous_id: Optional[str],
+    digest: Optional[str] = None,
+):
+    """
+    Plan a CV analysis, returning (content hash, prompt, previous analysis,
+    changes, section snapshot task or None). With a usable previous version
+    the prompt covers only the changed sections (None if nothing changed) and
+    outputs are merged into the previous analysis.
+    """
+    sections = asyncio.ensure_future(_cv_sections(source, digest)) if previous_id else None
+    if sections is not None:
+        update = _cv_update(previous_id, await sections)
+        if update is not None:
+            return (*update, sections)
+    digest, user_prompt = await _cv_prompt(source, input_mode, digest)
+    if sections is None and (input_mode or DEFAULT_CV_INPUT_MODE) == 'text':
+        # The text was just extracted and cached, so the snapshot is cheap. In
+        # PDF mode a local parse is only paid for CVs that are being revised.
+        sections = asyncio.ensure_future(_cv_sections(source, digest))
+    return digest, user_prompt, None, None, sections
+
+async def analyze_cv(
+    pdf_path: Path | bytes,
+    cv_id: Optional[str] = None,
+    input_mode: Optional[CVInputMode] = None,
+    previous_id: Optional[str] = None,
+    near_duplicates: DedupMode = DEFAULT_DEDUP_MODE,
+    digest: Optional[str] = None,
+) -> CVAnalysis:
     """
-    Analyze CV and extract key information
+    Analyze CV and extract key information. With previous_id (the ID of an
+    earlier version of the CV) only the changed sections are re-analyzed; in
+    text mode and with near_duplicates='reuse' a near-duplicate of an analyzed
+    CV gets its stored analysis. Callers that already hashed the PDF pass its
+    sha256 as digest, so it is not hashed again.
     """
-    global _cv_analysis_store
-    
     try:
-        result = await cv_review_agent.run([
-            f"Analyze the CV and provide a detailed breakdown of strengths, weaknesses, and improvement recommendations.",
-            BinaryContent(data=pdf_path.read_bytes(), media_type='application/pdf'),
-        ])
-        
-        # Store the analysis in the module-level variable
-        _cv_analysis_store = result.output.dict()
-        
-        return result.output
+        signature, similar = await _similar_cv(
+            pdf_path, input_mode, previous_id, _reuse_only(near_duplicates), digest
+        )
+        if similar is not None:
+            return similar.analysis
+        digest, user_prompt, previous, changes, sections = await _cv_request(
+            pdf_path, input_mode, previous_id, digest
+        )
+        if previous is not None and user_prompt is None:
+            output = previous
+        else:
+            output = await _cached_run(
+                'cv_review',
+                get_agent('cv_review'),
+                CVAnalysis,
+                cv_review_prompt,
+                user_prompt,
+                _cv_confident,
+                attachment_id=digest,
+            )
+            if previous is not None:
+                output = merge_cv(previous, output, changes)
+        await _remember_cv(cv_id or digest, output, sections)
+        await _index_signature('cv', cv_id or digest, signature)
+        return output
     except ValidationError as e:
-        logfire.error(f"Validation error in analyze_cv: {e}")
+        logger.error(f"Validation error in analyze_cv: {e}")
         raise
 
-async def score_cv_match(cv_analysis: CVAnalysis, job_requirements: JobRequirements) -> MatchingScore:
+ScoringMode = Literal['fast', 'full']
+
+async def score_cv_match(
+    cv_analysis: CVAnalysis,
+    job_requirements: JobRequirements,
+    mode: ScoringMode = 'full',
+) -> MatchingScore:
     """
-    Score how well the CV matches the job requirements
+    Score how well the CV matches the job requirements.
+
+    The skill, language and qualification overlaps are computed locally. In
+    'fast' mode the provisional local score is returned without calling the
+    model; in 'full' mode the model adds scores and detailed feedback.
     """
+    provisional = local_match(cv_analysis, job_requirements)
+    if mode == 'fast':
+        return provisional
     try:
-        result = await scoring_agent.run(
-            f"Provide a score between 0 and 100 based on how well the CV matches the job requirements: {cv_analysis} {job_requirements}"
+        result = await _cached_run(
+            'scoring',
+            get_agent('scoring'),
+            MatchingScore,
+            scoring_prompt,
+            _score_prompt(cv_analysis, job_requirements),
+            _score_check(provisional),
         )
-        return result.output
+        return result
     except ValidationError as e:
-        logfire.error(f"Validation error in score_cv_match: {e}")
+        logger.error(f"Validation error in score_cv_match: {e}")
         raise
 
+# --- Streaming Variants ---
+# Each yields (output, is_final); partial outputs contain the fields
+# the model has produced so far
+async def stream_job_vacancy_analysis(
+    vacancy_text: str,
+    job_id: Optional[str] = None,
+    previous_id: Optional[str] = None,
+    near_duplicates: DedupMode = DEFAULT_DEDUP_MODE,
+) -> AsyncIterator[Tuple[JobRequirements, bool]]:
+    """
+    Stream the extraction of requirements from job vacancy text
+    """
+    try:
+        job_id = job_id or analysis_id(vacancy_text)
+        signature, similar = await _similar_job(vacancy_text, job_id, previous_id, _reuse_only(near_duplicates))
+        if similar is not None:
+            yield similar.analysis, True
+            return
+        snapshot, user_prompt, previous = _job_update(vacancy_text, previous_id)
+        if user_prompt is None:
+            await _remember_job(job_id, previous, snapshot)
+            yield previous, True
+            return
+        async for output, final in _streamed_run(
+            'job_requirements',
+            get_agent('job_requirements'),
+            JobRequirements,
+            job_requirements_prompt,
+            user_prompt,
+            _job_confident,
+        ):
+            if final:
+                await _remember_job(job_id, output, snapshot)
+                await _index_signature('job', job_id, signature)
+            yield output, final
+    except ValidationError as e:
+        logger.error(f"Validation error in stream_job_vacancy_analysis: {e}")
+        raise
+
+async def stream_cv_analysis(
+    data: bytes,
+    cv_id: Optional[str] = None,
+    input_mode: Optional[CVInputMode] = None,
+    previous_id: Optional[str] = None,
+    near_duplicates: DedupMode = DEFAULT_DEDUP_MODE,
+    digest: Optional[str] = None,
+) -> AsyncIterator[Tuple[CVAnalysis, bool]]:
+    """
+    Stream the analysis of CV PDF bytes; digest is their sha256 if already known
+    """
+    try:
+        signature, similar = await _similar_cv(data, input_mode, previous_id, _reuse_only(near_duplicates), digest)
+        if similar is not None:
+            yield similar.analysis, True
+            return
+        digest, user_prompt, previous, changes, sections = await _cv_request(data, input_mode, previous_id, digest)
+        if previous is not None and user_prompt is None:
+            await _remember_cv(cv_id or digest, previous, sections)
+            yield previous, True
+            return
+        async for output, final in _streamed_run(
+            'cv_review',
+            get_agent('cv_review'),
+            CVAnalysis,
+            cv_review_prompt,
+            user_prompt,
+            _cv_confident,
+            attachment_id=digest,
+        ):
+            if previous is not None:
+                output = merge_cv(previous, output, changes)
+            if final:
+                await _remember_cv(cv_id or digest, output, sections)
+                await _index_signature('cv', cv_id or digest, signature)
+            yield output, final
+    except ValidationError as e:
+        logger.error(f"Validation error in stream_cv_analysis: {e}")
+        raise
+
+async def stream_cv_match(
+    cv_analysis: CVAnalysis,
+    job_requirements: JobRequirements,
+    mode: ScoringMode = 'full',
+) -> AsyncIterator[Tuple[MatchingScore, bool]]:
+    """
+    Stream a matching score, starting with the local provisional score
+    """
+    provisional = local_match(cv_analysis, job_requirements)
+    yield provisional, mode == 'fast'
+    if mode == 'fast':
+        return
+    try:
+        async for output, final in _streamed_run(
+            'scoring',
+            get_agent('scoring'),
+            MatchingScore,
+            scoring_prompt,
+            _score_prompt(cv_analysis, job_requirements),
+            _score_check(provisional),
+        ):
+            yield (output if final else _with_provisional_overlaps(output, provisional)), final
+    except ValidationError as e:
+        logger.error(f"Validation error in stream_cv_match: {e}")
+        raise
+
+async def score_cv_matches(
+    cv_analyses: List[CVAnalysis],
+    job_requirements_list: List[JobRequirements],
+    pairs: Optional[List[Tuple[int, int]]] = None,
+    concurrency: int = 8,
+    mode: ScoringMode = 'full',
+) -> AsyncIterator[Tuple[int, int, MatchingScore | Exception]]:
+    """
+    Score many CV/job pairs concurrently, yielding (cv_index, job_index, result)
+    as soon as each pair finishes. Failed pairs yield the exception instead of
+    aborting the whole batch.
+    """
+    if pairs is None:
+        pairs = [(i, j) for i in range(len(cv_analyses)) for j in range(len(job_requirements_list))]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def score_pair(i: int, j: int):
+        async with semaphore:
+            try:
+                return i, j, await score_cv_match(cv_analyses[i], job_requirements_list[j], mode)
+            except Exception as e:
+                return i, j, e
+
+    tasks = [asyncio.create_task(score_pair(i, j)) for i, j in pairs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding model calls if the consumer goes away early
+        for task in tasks:
+            task.cancel()
+
+async def compare_vacancies(
+    cv_analysis: CVAnalysis,
+    vacancy_texts: List[str],
+    concurrency: int = 8,
+    mode: ScoringMode = 'full',
+) -> AsyncIterator[Tuple[int, str, MatchingScore | Exception, bool]]:
+    """
+    Analyze many vacancies and score one CV against each, yielding (index,
+    job_id, result, is_final) as results arrive. The local provisional score
+    of a vacancy comes first, as soon as its requirements are known. Stored
+    requirements are reused and repeated vacancies are analyzed once; a failed
+    vacancy yields its exception instead of aborting the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    requirements: Dict[str, asyncio.Task] = {}
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def requirements_for(vacancy_text: str, job_id: str) -> JobRequirements:
+        stored = analysis_store.get('job', job_id, JobRequirements)
+        if stored is not None:
+            return stored
+        async with semaphore:
+            return await analyze_job_vacancy(vacancy_text, job_id)
+
+    async def compare(index: int, vacancy_text: str) -> None:
+        job_id = analysis_id(vacancy_text)
+        try:
+            if job_id not in requirements:
+                requirements[job_id] = asyncio.ensure_future(requirements_for(vacancy_text, job_id))
+            job_requirements = await asyncio.shield(requirements[job_id])
+            results.put_nowait((index, job_id, local_match(cv_analysis, job_requirements), mode == 'fast'))
+            if mode == 'full':
+                async with semaphore:
+                    result = await score_cv_match(cv_analysis, job_requirements, mode)
+                results.put_nowait((index, job_id, result, True))
+        except Exception as e:
+            results.put_nowait((index, job_id, e, True))
+
+    tasks = [asyncio.create_task(compare(i, text)) for i, text in enumerate(vacancy_texts)]
+    try:
+        for _ in range(len(tasks)):
+            while True:
+                item = await results.get()
+                yield item
+                if item[3]:
+                    break
+    finally:
+        # Stop outstanding model calls if the consumer goes away early
+        for task in [*tasks, *requirements.values()]:
+            task.cancel()
+
+# --- Job Queue ---
+# Long-running analyses can be queued and collected later instead of holding
+# the HTTP connection open; RESUME_JOB_WORKERS=0 leaves processing to
+# standalone `python jobs.py` workers
+job_queue = JobQueue(
+    os.getenv('RESUME_JOB_QUEUE_PATH', '.cache/jobs.sqlite3'),
+    max_attempts=int(os.getenv('RESUME_JOB_MAX_ATTEMPTS', '3')),
+    callback_hosts=[h.strip() for h in os.getenv('RESUME_CALLBACK_ALLOWED_HOSTS', '').split(',') if h.strip()],
+    allow_private_callbacks=os.getenv('RESUME_CALLBACK_ALLOW_PRIVATE', '0') == '1',
+)
+
+async def _run_cv_job(params: dict, payload: Optional[bytes]) -> dict:
+    # The job's cv_id is the upload's content hash
+    result = await analyze_cv(payload, params['cv_id'], params.get('input_mode'), digest=params['cv_id'])
+    return {'analysis_id': params['cv_id'], **result.model_dump()}
+
+job_handlers = {'analyze-cv': _run_cv_job}
+
+# --- Index Refresh ---
+# The candidate and near-duplicate indexes are per process. Analyses made by
+# other workers reach them through the shared stores (sqlite or redis backend)
+# on the next refresh.
+INDEX_REFRESH_SECONDS = float(os.getenv('RESUME_INDEX_REFRESH_SECONDS', '60'))
+
+# Start of the last refresh; later refreshes read only entries stored since
+# then, with a margin for writes that were committing at the time
+_refreshed_at: Optional[float] = None
+
+async def refresh_indexes() -> None:
+    """
+    Add CVs and fingerprints stored since the last refresh, by any worker, to
+    this worker's indexes; the stores are read off the event loop
+    """
+    global _refreshed_at
+    started = time.time()
+    since = None if _refreshed_at is None else _refreshed_at - 5
+
+    def load():
+        cvs = list(analysis_store.items('cv', CVAnalysis, since))
+        fingerprints = {
+            kind: [
+                (key.removesuffix(':minhash'), fingerprint.to_signature())
+                for key, fingerprint in fingerprint_store.items(f'{kind}_minhash', Fingerprint, since)
+            ]
+            for kind in similarity_index
+        }
+        return cvs, fingerprints
+
+    cvs, fingerprints = await asyncio.to_thread(load)
+    for cv_id, cv_analysis in cvs:
+        candidate_index.add(cv_id, cv_analysis)
+    for kind, entries in fingerprints.items():
+        for doc_id, signature in entries:
+            similarity_index[kind].add(doc_id, signature)
+    _refreshed_at = started
+
+async def _refresh_indexes(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_indexes()
+        except Exception as e:
+            logger.error(f"Index refresh failed: {e}")
+
 # --- FastAPI API ---
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Rebuild the candidate index from previously analyzed CVs, and the
+    # near-duplicate indexes from the stored fingerprints
+    await refresh_indexes()
+    workers = [
+        asyncio.create_task(job_queue.work(job_handlers))
+        for _ in range(int(os.getenv('RESUME_JOB_WORKERS', '2')))
+    ]
+    if INDEX_REFRESH_SECONDS > 0:
+        workers.append(asyncio.create_task(_refresh_indexes(INDEX_REFRESH_SECONDS)))
+    if score_log is not None:
+        workers.append(asyncio.create_task(score_log.run(float(os.getenv('RESUME_ANALYTICS_FLUSH_SECONDS', '60')))))
+    yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+# Routes that stream SSE or NDJSON; gzip would hold results back until its
+# buffer fills. Listed explicitly rather than relying on the Starlette version
+# to skip text/event-stream, and covering NDJSON, which it never skips.
+STREAMED_PATHS = (
+    '/analyze-job-vacancy/stream',
+    '/analyze-cv/stream',
+    '/score-cv-match/stream',
+    '/score-cv-match/batch',
+    '/compare-vacancies',
+)
+
+class _GZipExceptStreams:
+    """GZip middleware that passes the streaming routes through uncompressed"""
+
+    def __init__(self, app, minimum_size: int):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        # endswith, so the routes are matched under a root path too
+        if scope['type'] == 'http' and scope['path'].endswith(STREAMED_PATHS):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(_GZipExceptStreams, minimum_size=int(os.getenv('RESUME_GZIP_MIN_SIZE', '1000')))
+
+async def _read_upload(file: UploadFile) -> Tuple[str, bytes]:
+    """
+    Read an upload in one go and hash it; returns (content hash, bytes).
+    The request body is already spooled by the server, so a single read
+    keeps one copy in memory, and the bytes go to the agent directly.
+    """
+    with stage('upload_read', 'cv_review'):
+        await file.seek(0)
+        contents = await file.read()
+        # hashlib releases the GIL for large buffers, so hash off the event loop
+        digest = await asyncio.to_thread(hashlib.sha256, contents)
+        return digest.hexdigest(), contents
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # For streaming responses this measures the time to the first byte
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    metrics.observe(
+        'resume_http_request_duration_seconds',
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route else 'unmatched',
+        status=str(response.status_code),
+    )
+    return response
+
+def _http_error(e: Exception) -> HTTPException:
+    """
+    Policy rejections become 429/503/504 with Retry-After; other errors stay 400
+    """
+    if isinstance(e, PolicyError):
+        return HTTPException(status_code=e.status_code, detail=str(e), headers=retry_after_header(e))
+    return HTTPException(status_code=400, detail=str(e))
 
 # Serve the frontend.html at the root
 @app.get("/", response_class=HTMLResponse)
@@ -103,51 +1086,344 @@ async def serve_frontend():
     with open("frontend.html", "r", encoding="utf-8") as f:
         return f.read()
 
+def _near_duplicate_response(own_id: str, similar: NearDuplicate, mode: DedupMode) -> Tuple[dict, dict]:
+    """
+    (body fields, headers) for a near-duplicate: a reused analysis is returned
+    under the input's own ID, an offered one under the original's
+    """
+    fields = {'analysis_id': own_id if mode == 'reuse' else similar.analysis_id, **similar.analysis.model_dump()}
+    headers = {
+        'X-Near-Duplicate-Of': similar.analysis_id,
+        'X-Near-Duplicate-Similarity': f"{similar.similarity:.3f}",
+    }
+    return fields, headers
+
 class VacancyRequest(BaseModel):
     vacancy_text: str
+    # analysis_id of an earlier version of this vacancy, to re-extract only the edits
+    previous_id: Optional[str] = None
+    # 'reuse', 'offer' or 'off'; defaults to RESUME_DEDUP_MODE
+    near_duplicates: Optional[DedupMode] = None
 
 @app.post("/analyze-job-vacancy")
-async def api_analyze_job_vacancy(req: VacancyRequest):
+async def api_analyze_job_vacancy(req: VacancyRequest, response: Response):
     try:
-        result = await analyze_job_vacancy(req.vacancy_text)
-        return result.model_dump()
+        job_id = analysis_id(req.vacancy_text)
+        mode = req.near_duplicates or DEFAULT_DEDUP_MODE
+        _, similar = await _similar_job(req.vacancy_text, job_id, req.previous_id, mode)
+        if similar is not None:
+            fields, headers = _near_duplicate_response(job_id, similar, mode)
+            response.headers.update(headers)
+            return fields
+        result = await analyze_job_vacancy(req.vacancy_text, job_id, req.previous_id, 'off')
+        with stage('serialization', 'job_requirements'):
+            return {'analysis_id': job_id, **result.model_dump()}
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        raise _http_error(e)
 
 @app.post("/analyze-cv")
-async def api_analyze_cv(file: UploadFile = File(...)):
+async def api_analyze_cv(
+    response: Response,
+    file: UploadFile = File(...),
+    input_mode: Optional[CVInputMode] = None,
+    previous_id: Optional[str] = None,
+    near_duplicates: Optional[DedupMode] = None,
+):
     try:
-        # Save uploaded file temporarily
-        contents = await file.read()
-        tmp_path = Path(f"/tmp/{file.filename}")
-        tmp_path.write_bytes(contents)
-        result = await analyze_cv(tmp_path)
-        tmp_path.unlink(missing_ok=True)
-        return result.model_dump()
+        cv_id, contents = await _read_upload(file)
+        mode = near_duplicates or DEFAULT_DEDUP_MODE
+        _, similar = await _similar_cv(contents, input_mode, previous_id, mode, cv_id)
+        if similar is not None:
+            fields, headers = _near_duplicate_response(cv_id, similar, mode)
+            response.headers.update(headers)
+            return fields
+        result = await analyze_cv(contents, cv_id, input_mode, previous_id, 'off', digest=cv_id)
+        with stage('serialization', 'cv_review'):
+            return {'analysis_id': cv_id, **result.model_dump()}
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-# Store CV analysis in a module-level variable as a simple in-memory store
-# In a production environment, consider using a proper database or cache
-_cv_analysis_store = None
+        raise _http_error(e)
 
-@app.get("/analyze-cv-summary")
-async def api_analyze_cv_summary():
-    """Return a summary of CV analysis without requiring job requirements"""
-    if _cv_analysis_store is None:
+@app.get("/analyze-cv-summary/{cv_id}")
+async def api_analyze_cv_summary(cv_id: str):
+    """Return a stored CV analysis without requiring job requirements"""
+    result = analysis_store.get('cv', cv_id, CVAnalysis)
+    if result is None:
         raise HTTPException(status_code=404, detail="No CV analysis found. Please upload a CV first.")
-    return _cv_analysis_store
+    return {'analysis_id': cv_id, **result.model_dump()}
 
 class ScoreRequest(BaseModel):
     cv_analysis: dict
     job_requirements: dict
+    # 'fast' returns the local provisional score without calling the model
+    mode: ScoringMode = 'full'
 
 @app.post("/score-cv-match")
 async def api_score_cv_match(req: ScoreRequest):
+    try:
+        with stage('validation', 'scoring'):
+            cv_obj = CVAnalysis(**req.cv_analysis)
+            job_obj = JobRequirements(**req.job_requirements)
+        result = await score_cv_match(cv_obj, job_obj, req.mode)
+        _log_score(
+            _analysis_ref(req.cv_analysis, cv_obj), _analysis_ref(req.job_requirements, job_obj), result, req.mode
+        )
+        with stage('serialization', 'scoring'):
+            return result.model_dump() if hasattr(result, 'model_dump') else result
+    except Exception as e:
+        raise _http_error(e)
+
+# --- Streaming API (Server-Sent Events) ---
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _sse_response(stream: AsyncIterator[Tuple[BaseModel, bool]], extra: Optional[dict] = None) -> StreamingResponse:
+    """
+    Emit 'partial' events while the model works, then one 'complete' (or 'error') event
+    """
+    async def events():
+        try:
+            async for output, final in stream:
+                yield _sse('complete' if final else 'partial', {**(extra or {}), **output.model_dump()})
+        except Exception as e:
+            error = _http_error(e)
+            data = {'detail': error.detail, 'status': error.status_code}
+            if error.headers:
+                data['retry_after'] = int(error.headers['Retry-After'])
+            yield _sse('error', data)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def _sse_near_duplicate(own_id: str, similar: NearDuplicate, mode: DedupMode) -> StreamingResponse:
+    fields, headers = _near_duplicate_response(own_id, similar, mode)
+
+    async def events():
+        yield _sse('complete', fields)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", **headers})
+
+@app.post("/analyze-job-vacancy/stream")
+async def api_analyze_job_vacancy_stream(req: VacancyRequest):
+    job_id = analysis_id(req.vacancy_text)
+    mode = req.near_duplicates or DEFAULT_DEDUP_MODE
+    _, similar = await _similar_job(req.vacancy_text, job_id, req.previous_id, mode)
+    if similar is not None:
+        return _sse_near_duplicate(job_id, similar, mode)
+    return _sse_response(
+        stream_job_vacancy_analysis(req.vacancy_text, job_id, req.previous_id, 'off'), {'analysis_id': job_id}
+    )
+
+@app.post("/analyze-cv/stream")
+async def api_analyze_cv_stream(
+    file: UploadFile = File(...),
+    input_mode: Optional[CVInputMode] = None,
+    previous_id: Optional[str] = None,
+    near_duplicates: Optional[DedupMode] = None,
+):
+    cv_id, contents = await _read_upload(file)
+    mode = near_duplicates or DEFAULT_DEDUP_MODE
+    _, similar = await _similar_cv(contents, input_mode, previous_id, mode, cv_id)
+    if similar is not None:
+        return _sse_near_duplicate(cv_id, similar, mode)
+    return _sse_response(
+        stream_cv_analysis(contents, cv_id, input_mode, previous_id, 'off', digest=cv_id), {'analysis_id': cv_id}
+    )
+
+@app.post("/score-cv-match/stream")
+async def api_score_cv_match_stream(req: ScoreRequest):
     try:
         cv_obj = CVAnalysis(**req.cv_analysis)
         job_obj = JobRequirements(**req.job_requirements)
-        result = await score_cv_match(cv_obj, job_obj)
-        return result.model_dump() if hasattr(result, 'model_dump') else result
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+    cv_id, job_id = _analysis_ref(req.cv_analysis, cv_obj), _analysis_ref(req.job_requirements, job_obj)
+
+    async def logged():
+        async for output, final in stream_cv_match(cv_obj, job_obj, req.mode):
+            if final:
+                _log_score(cv_id, job_id, output, req.mode)
+            yield output, final
+
+    return _sse_response(logged())
+
+# Pairs scored by one batch request, whether listed or implied (N x M)
+BATCH_MAX_PAIRS = int(os.getenv('RESUME_BATCH_MAX_PAIRS', '1000'))
+
+class ScoreBatchRequest(BaseModel):
+    cv_analyses: List[dict] = Field(..., min_length=1, max_length=BATCH_MAX_PAIRS)
+    job_requirements: List[dict] = Field(..., min_length=1, max_length=BATCH_MAX_PAIRS)
+    # Explicit (cv_index, job_index) pairs; defaults to every CV against every job
+    pairs: Optional[List[Tuple[int, int]]] = Field(default=None, max_length=BATCH_MAX_PAIRS)
+    concurrency: int = Field(default=int(os.getenv('RESUME_BATCH_CONCURRENCY', '8')), ge=1, le=64)
+    mode: ScoringMode = 'full'
+
+@app.post("/score-cv-match/batch")
+async def api_score_cv_match_batch(req: ScoreBatchRequest):
+    """Score N x M CV/job pairs concurrently and stream results as NDJSON"""
+    if req.pairs is None and len(req.cv_analyses) * len(req.job_requirements) > BATCH_MAX_PAIRS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(req.cv_analyses)} x {len(req.job_requirements)} pairs exceed the limit of {BATCH_MAX_PAIRS}; "
+                   "send fewer analyses or explicit pairs",
+        )
+    try:
+        cv_objs = [CVAnalysis(**cv) for cv in req.cv_analyses]
+        job_objs = [JobRequirements(**job) for job in req.job_requirements]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for i, j in req.pairs or []:
+        if not (0 <= i < len(cv_objs) and 0 <= j < len(job_objs)):
+            raise HTTPException(status_code=400, detail=f"Pair ({i}, {j}) is out of range")
+
+    cv_ids = [_analysis_ref(cv, cv_obj) for cv, cv_obj in zip(req.cv_analyses, cv_objs)]
+    job_ids = [_analysis_ref(job, job_obj) for job, job_obj in zip(req.job_requirements, job_objs)]
+
+    async def ndjson():
+        async for i, j, result in score_cv_matches(cv_objs, job_objs, req.pairs, req.concurrency, req.mode):
+            line = {"cv_index": i, "job_index": j}
+            if isinstance(result, Exception):
+                line["error"] = str(result)
+            else:
+                _log_score(cv_ids[i], job_ids[j], result, req.mode)
+                line["result"] = result.model_dump()
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+class CompareRequest(BaseModel):
+    cv_analysis: dict
+    vacancy_texts: List[str] = Field(..., min_length=1, max_length=100)
+    concurrency: int = Field(default=int(os.getenv('RESUME_BATCH_CONCURRENCY', '8')), ge=1, le=64)
+    mode: ScoringMode = 'full'
+
+@app.post("/compare-vacancies")
+async def api_compare_vacancies(req: CompareRequest):
+    """Analyze many vacancies, score the CV against each and stream results as NDJSON"""
+    try:
+        cv_obj = CVAnalysis(**req.cv_analysis)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cv_id = _analysis_ref(req.cv_analysis, cv_obj)
+
+    async def ndjson():
+        async for index, job_id, result, final in compare_vacancies(
+            cv_obj, req.vacancy_texts, req.concurrency, req.mode
+        ):
+            line = {"index": index, "analysis_id": job_id, "final": final}
+            if isinstance(result, Exception):
+                line["error"] = str(result)
+            else:
+                if final:
+                    _log_score(cv_id, job_id, result, req.mode)
+                line["result"] = result.model_dump()
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+class RankRequest(BaseModel):
+    job_requirements: dict
+    top_k: int = Field(default=20, ge=1, le=1000)
+    # Re-score only the top_k candidates with the scoring agent
+    rescore: bool = False
+
+@app.post("/rank-candidates")
+async def api_rank_candidates(req: RankRequest):
+    """Rank every indexed CV against a vacancy, optionally re-scoring the top_k with the model"""
+    try:
+        job_obj = JobRequirements(**req.job_requirements)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ranked = candidate_index.rank(job_obj, req.top_k)
+    candidates = [asdict(candidate) for candidate in ranked]
+    if req.rescore and ranked:
+        cv_objs = [candidate_index.get(candidate.cv_id) for candidate in ranked]
+        job_id = _analysis_ref(req.job_requirements, job_obj)
+        async for i, _, result in score_cv_matches(cv_objs, [job_obj]):
+            if isinstance(result, Exception):
+                candidates[i]["match_error"] = str(result)
+            else:
+                _log_score(ranked[i].cv_id, job_id, result, 'full')
+                candidates[i]["match"] = result.model_dump()
+        candidates.sort(key=lambda c: c["match"]["overall_score"] if "match" in c else -1, reverse=True)
+    return {"total": len(candidate_index), "candidates": candidates}
+
+# --- Job API ---
+@app.post("/jobs/analyze-cv", status_code=202)
+async def api_queue_cv_analysis(
+    file: UploadFile = File(...),
+    input_mode: Optional[CVInputMode] = None,
+    priority: int = 0,
+    callback_url: Optional[str] = None,
+):
+    """Queue a CV analysis and return its job ID straight away"""
+    if callback_url is not None:
+        try:
+            await job_queue.check_callback_url(callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    cv_id, contents = await _read_upload(file)
+    mode = input_mode or DEFAULT_CV_INPUT_MODE
+    # The same CV in the same mode maps to the same job, so client retries never redo work
+    job_id = ResultCache.make_key('analyze-cv', cv_id, mode)
+    return job_queue.enqueue(
+        job_id,
+        'analyze-cv',
+        {'cv_id': cv_id, 'input_mode': mode},
+        contents,
+        priority=priority,
+        callback_url=callback_url,
+    )
+
+@app.get("/jobs/{job_id}")
+async def api_get_job(job_id: str):
+    """Return a job's status, and its result or error once finished"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --- Analytics API ---
+def _require_score_log():
+    if score_log is None:
+        raise HTTPException(status_code=503, detail="Score analytics are disabled (set RESUME_ANALYTICS=1 and install pyarrow)")
+    return score_log
+
+@app.get("/analytics/score-distribution")
+async def api_score_distribution(
+    job_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    mode: ScoringMode = 'full',
+    bins: int = Query(default=10, ge=1, le=100),
+    limit: int = Query(default=20, ge=1, le=1000),
+):
+    """Overall score distribution per vacancy, most scored vacancies first"""
+    log = _require_score_log()
+    return {'vacancies': await asyncio.to_thread(log.score_distribution, job_id, since, mode, bins, limit)}
+
+@app.get("/analytics/missing-requirements")
+async def api_missing_requirements(
+    job_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    mode: ScoringMode = 'full',
+    limit: int = Query(default=20, ge=1, le=1000),
+):
+    """Most common missing requirements across scores, optionally for one vacancy"""
+    log = _require_score_log()
+    return {'requirements': await asyncio.to_thread(log.missing_requirements, job_id, since, mode, limit)}
+
+@app.get("/routing/stats")
+async def api_routing_stats():
+    """Return the model tiers, per-agent routing decisions and latency, and policy state"""
+    return {**router.stats(), 'policy': policy.stats()}
+
+@app.get("/cache/stats")
+async def api_cache_stats():
+    """Return result cache size and hit/miss counters"""
+    return result_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def api_metrics():
+    """Per-stage latency, token, cost and cache metrics in Prometheus text format"""
+    record_cache_stats(result_cache.stats())
+    for status, count in job_queue.counts().items():
+        metrics.set('resume_jobs', count, status=status)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
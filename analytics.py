@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from models import MatchingScore
+
+try:
+    import fcntl
+except ImportError:  # Windows: compactions are not coordinated across workers
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Every MatchingScore field is stored, after the row's identifying columns
+_COLUMNS = ("timestamp", "cv_id", "job_id", "mode", *MatchingScore.model_fields)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("The score analytics store requires the 'pyarrow' package") from e
+    return pa, pc, ds, pq
+
+
+def _schema():
+    pa = _pyarrow()[0]
+    return pa.schema([
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("cv_id", pa.string()),
+        ("job_id", pa.string()),
+        ("mode", pa.string()),
+        ("overall_score", pa.int16()),
+        ("skills_match", pa.int16()),
+        ("experience_match", pa.int16()),
+        # Segments written before these columns existed read them as nulls
+        ("detailed_feedback", pa.string()),
+        ("missing_requirements", pa.list_(pa.string())),
+        ("improvement_suggestions", pa.list_(pa.string())),
+        ("matched_skills", pa.list_(pa.string())),
+        ("matched_qualifications", pa.list_(pa.string())),
+        ("matched_languages", pa.list_(pa.string())),
+    ])
+
+
+class ScoreLog:
+    """
+    Append-only columnar log of matching scores. Rows are buffered in memory
+    and written as Parquet segments of up to batch_size rows, so each write is
+    one file and every worker process writes its own segments. Queries scan
+    only the columns they need and aggregate in Arrow. Once more than
+    compact_segments segments exist, run() merges them into one.
+    """
+
+    def __init__(self, path: str | Path, batch_size: int = 10000, compact_segments: Optional[int] = 64):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.compact_segments = compact_segments
+        self._buffer: Dict[str, list] = {column: [] for column in _COLUMNS}
+        # Batches swapped out of the buffer whose segment is not published yet
+        self._flushing: List[Dict[str, list]] = []
+        self._lock = threading.Lock()
+        # Serializes segment writes and compaction within the process
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Rows waiting to be written"""
+        return len(self._buffer["timestamp"])
+
+    def append(self, cv_id: str, job_id: str, score: MatchingScore, mode: str = "full") -> None:
+        row = {
+            "timestamp": datetime.now(timezone.utc),
+            "cv_id": cv_id,
+            "job_id": job_id,
+            "mode": mode,
+            **score.model_dump(),
+        }
+        with self._lock:
+            for column, value in row.items():
+                self._buffer[column].append(value)
+            full = len(self) >= self.batch_size
+        if full:
+            # Written off the caller's thread; the buffer is swapped out first
+            threading.Thread(target=self.flush, name="score-log-flush", daemon=True).start()
+
+    def flush(self) -> int:
+        """Write buffered rows as a new segment; returns the number of rows written"""
+        with self._lock:
+            if not len(self):
+                return 0
+            rows, self._buffer = self._buffer, {column: [] for column in _COLUMNS}
+            self._flushing.append(rows)
+        pa, _, _, pq = _pyarrow()
+        table = pa.table(rows, schema=_schema())
+        with self._write_lock:
+            tmp = self._write(pq, table)
+            # Publishing the segment and dropping the batch from memory is one
+            # step for readers, so no query counts the rows twice or misses them
+            with self._lock:
+                os.replace(tmp, self.path / f"scores-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+                self._flushing = [batch for batch in self._flushing if batch is not rows]
+        return table.num_rows
+
+    def _write(self, pq, table) -> Path:
+        """Write a table to a hidden temporary file; readers only pick up *.parquet"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f".{uuid.uuid4().hex}.tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        return tmp
+
+    async def run(self, interval: float = 60.0) -> None:
+        """
+        Flush every interval seconds until cancelled, and once more on the way
+        out; compact when the segment count passes compact_segments
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.flush)
+                if self.compact_segments and len(self.segments()) > self.compact_segments:
+                    try:
+                        merged = await asyncio.to_thread(self.compact)
+                    except Exception as e:
+                        logger.error(f"Compacting the score log failed: {e}")
+                    else:
+                        if merged:
+                            logger.info(f"Merged {merged} score log segments")
+        finally:
+            self.flush()
+
+    def segments(self) -> List[Path]:
+        return sorted(self.path.glob("*.parquet")) if self.path.exists() else []
+
+    def compact(self) -> int:
+        """
+        Merge all segments into one, returning the number of segments merged.
+        Segments written meanwhile by other processes are left for the next run,
+        and nothing is merged while another process is compacting.
+        """
+        self.flush()
+        if len(self.segments()) < 2:
+            return 0
+        _, _, ds, pq = _pyarrow()
+        with self._write_lock, self._compaction_lock() as locked:
+            # Listed under the lock, so two workers never merge the same segments
+            segments = self.segments()
+            if not locked or len(segments) < 2:
+                return 0
+            table = ds.dataset(segments, format="parquet", schema=_schema()).to_table()
+            tmp = self._write(pq, table)
+            with self._lock:
+                os.replace(tmp, self.path / f"scores-{time.time_ns()}-compacted.parquet")
+                for segment in segments:
+                    segment.unlink(missing_ok=True)
+        return len(segments)
+
+    @contextmanager
+    def _compaction_lock(self) -> Iterator[bool]:
+        """Yields whether this process holds the store's compaction lock"""
+        if fcntl is None:
+            yield True
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path / ".compact.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+            else:
+                yield True
+        finally:
+            os.close(fd)
+
+    def _scan(
+        self,
+        columns: List[str],
+        job_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        mode: Optional[str] = None,
+    ):
+        """
+        Arrow table of the given columns, filtered by vacancy, time and scoring
+        mode, over the written segments plus the rows still buffered in memory
+        """
+        pa, pc, ds, _ = _pyarrow()
+        conditions = []
+        if job_id is not None:
+            conditions.append(ds.field("job_id") == job_id)
+        if since is not None:
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            conditions.append(ds.field("timestamp") >= pa.scalar(since, type=pa.timestamp("ms", tz="UTC")))
+        if mode is not None:
+            conditions.append(ds.field("mode") == mode)
+        condition = None
+        for c in conditions:
+            condition = c if condition is None else condition & c
+        for attempt in range(3):
+            with self._lock:
+                # Copied so appends can go on while the query runs
+                pending = [{column: list(values) for column, values in self._buffer.items()}, *self._flushing]
+                segments = self.segments()
+            tables = [
+                ds.dataset(pa.table(rows, schema=_schema())).to_table(columns=columns, filter=condition)
+                for rows in pending if rows["timestamp"]
+            ]
+            try:
+                if segments:
+                    dataset = ds.dataset(segments, format="parquet", schema=_schema())
+                    tables.append(dataset.to_table(columns=columns, filter=condition))
+            except FileNotFoundError:
+                # A compaction in another process replaced the segments; list them again
+                if attempt == 2:
+                    raise
+                continue
+            break
+        if not tables:
+            return _schema().empty_table().select(columns)
+        return pa.concat_tables(tables)
+
+    def score_distribution(
+        self,
+        job_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        mode: str = "full",
+        bins: int = 10,
+        limit: int = 20,
+    ) -> List[dict]:
+        """
+        Overall score distribution per vacancy (count, mean, min, max, median,
+        90th percentile and a histogram over 0-100), most scored vacancies first
+        """
+        pa, pc, _, _ = _pyarrow()
+        table = self._scan(["job_id", "overall_score"], job_id, since, mode)
+        if not table.num_rows:
+            return []
+        stats = table.group_by("job_id").aggregate([
+            ("overall_score", "count"),
+            ("overall_score", "mean"),
+            ("overall_score", "min"),
+            ("overall_score", "max"),
+            ("overall_score", "tdigest", pc.TDigestOptions(q=[0.5, 0.9])),
+        ]).sort_by([("overall_score_count", "descending")]).slice(0, limit)
+
+        # Histogram counts per (vacancy, bin) for the selected vacancies only
+        table = table.filter(pc.is_in(table["job_id"], value_set=stats["job_id"].combine_chunks()))
+        width = 100 / bins
+        bucket = pc.min_element_wise(
+            pc.floor(pc.divide(pc.cast(table["overall_score"], pa.float64()), width)).cast(pa.int32()),
+            bins - 1,
+        )
+        counts = pa.table({"job_id": table["job_id"], "bin": bucket}).group_by(["job_id", "bin"]).aggregate(
+            [("bin", "count")]
+        )
+        histograms = {job: [0] * bins for job in stats["job_id"].to_pylist()}
+        for job, index, count in zip(*(counts[c].to_pylist() for c in ("job_id", "bin", "bin_count"))):
+            histograms[job][index] = count
+
+        return [
+            {
+                "job_id": row["job_id"],
+                "count": row["overall_score_count"],
+                "mean": round(row["overall_score_mean"], 2),
+                "min": row["overall_score_min"],
+                "max": row["overall_score_max"],
+                "median": round(row["overall_score_tdigest"][0], 2),
+                "p90": round(row["overall_score_tdigest"][1], 2),
+                "histogram": histograms[row["job_id"]],
+            }
+            for row in stats.to_pylist()
+        ]
+
+    def missing_requirements(
+        self,
+        job_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        mode: str = "full",
+        limit: int = 20,
+    ) -> List[dict]:
+        """
+        Most common missing requirements (case and surrounding whitespace
+        ignored), with how many scores listed them and their share of all scores
+        """
+        pa, pc, _, _ = _pyarrow()
+        table = self._scan(["missing_requirements"], job_id, since, mode)
+        if not table.num_rows:
+            return []
+        lists = table["missing_requirements"].combine_chunks()
+        items = pa.table({
+            "row": pc.list_parent_indices(lists),
+            "requirement": pc.utf8_lower(pc.utf8_trim_whitespace(pc.list_flatten(lists))),
+        })
+        items = items.filter(pc.not_equal(items["requirement"], ""))
+        # A requirement listed twice in one score counts once for it
+        items = items.group_by(["row", "requirement"]).aggregate([])
+        if not items.num_rows:
+            return []
+        counts = items.group_by("requirement").aggregate([("row", "count")])
+        top = pa.table({"requirement": counts["requirement"], "count": counts["row_count"]})
+        top = top.sort_by([("count", "descending"), ("requirement", "ascending")]).slice(0, limit)
+        return [
+            {**row, "share": round(row["count"] / table.num_rows, 4)} for row in top.to_pylist()
+        ]
+
+
+def create_score_log_from_env() -> Optional[ScoreLog]:
+    """
+    Build the score log from RESUME_ANALYTICS_* settings; None when disabled
+    with RESUME_ANALYTICS=0, or when pyarrow is not installed and analytics
+    were not asked for explicitly
+    """
+    setting = os.getenv("RESUME_ANALYTICS")
+    if setting == "0":
+        return None
+    if setting is None and find_spec("pyarrow") is None:
+        logger.info("pyarrow is not installed; score analytics are disabled")
+        return None
+    if find_spec("pyarrow") is None:
+        raise RuntimeError("RESUME_ANALYTICS=1 requires the 'pyarrow' package")
+    return ScoreLog(
+        os.getenv("RESUME_ANALYTICS_PATH", ".cache/analytics"),
+        batch_size=int(os.getenv("RESUME_ANALYTICS_BATCH_SIZE", "10000")),
+        compact_segments=int(os.getenv("RESUME_ANALYTICS_COMPACT_SEGMENTS", "64")),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the score analytics store")
+    parser.add_argument("command", choices=["compact"])
+    args = parser.parse_args()
+    score_log = create_score_log_from_env()
+    if score_log is None:
+        raise SystemExit("Score analytics are disabled")
+    print(f"Merged {score_log.compact()} segments into {score_log.path}")
@@ -1,6 +1,9 @@
 import streamlit as st
-import requests
-from typing import Dict, Any
+import asyncio
+import httpx
+import json
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from streamlit.runtime.caching import cache_data
 import os
 
@@ -13,7 +16,7 @@ st.set_page_config(
 )
 
 # API URL (assuming FastAPI is running on localhost:8000)
-API_URL = "http://localhost:8000"
+API_URL = os.getenv("RESUME_API_URL", "http://localhost:8000")
 
 # Initialize session state
 if 'initialized' not in st.session_state:
@@ -22,67 +25,181 @@ if 'initialized' not in st.session_state:
     st.session_state.cv_analysis = None
     st.session_state.matching_score = None
     st.session_state.cv_analyzed = False
+    st.session_state.vacancy_results = None
 
-def analyze_job_vacancy(vacancy_text: str) -> Dict[str, Any]:
-    """Send job vacancy text to the API for analysis"""
-    try:
-        response = requests.post(
-            f"{API_URL}/analyze-job-vacancy",
-            json={"vacancy_text": vacancy_text}
+# --- Shared API client ---
+class ApiClient:
+    """
+    One pooled, keep-alive async client shared by every session and rerun. It
+    lives on a background event loop, so the synchronous Streamlit script can
+    iterate streamed responses as they arrive.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="api-client", daemon=True).start()
+        self.client = self.run(self._create())
+
+    @staticmethod
+    async def _create() -> httpx.AsyncClient:
+        # Reads cover model calls, which can take a while; everything else fails fast
+        read_timeout = float(os.getenv("RESUME_API_TIMEOUT", "120"))
+        return httpx.AsyncClient(
+            base_url=API_URL,
+            timeout=httpx.Timeout(read_timeout, connect=5.0, pool=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={"Accept-Encoding": "gzip"},
         )
+
+    def run(self, coro):
+        """Run a coroutine on the client's loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def post_json(self, path: str, **kwargs) -> Dict[str, Any]:
+        response = await self.client.post(path, **kwargs)
         response.raise_for_status()
         return response.json()
-    except Exception as e:
-        st.error(f"Error analyzing job vacancy: {str(e)}")
-        return None
 
-def analyze_cv(file_bytes: bytes, filename: str) -> Dict[str, Any]:
-    """Upload and analyze CV"""
-    files = {"file": (filename, file_bytes, "application/pdf")}
-    response = requests.post(
-        f"{API_URL}/analyze-cv",
-        files=files,
-        timeout=60,
-    )
-    if response.status_code == 200:
-        return response.json()
-    else:
+    def iterate(self, agen) -> Iterator[Any]:
+        """Iterate an async generator from synchronous code"""
+        async def anext():
+            return await agen.__anext__()
+        try:
+            while True:
+                try:
+                    yield self.run(anext())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
+
+@st.cache_resource
+def api_client() -> ApiClient:
+    return ApiClient()
+
+def near_duplicate(response: httpx.Response) -> Optional[Dict[str, Any]]:
+    """The analyzed input the backend offered an analysis of, if it did"""
+    if "X-Near-Duplicate-Of" not in response.headers:
         return None
+    return {
+        "of": response.headers["X-Near-Duplicate-Of"],
+        "similarity": float(response.headers.get("X-Near-Duplicate-Similarity", 0)),
+    }
 
-def get_matching_score(cv_analysis: Dict[str, Any], job_requirements: Dict[str, Any]) -> Dict[str, Any]:
-    """Get matching score between CV and job requirements"""
-    try:
-        response = requests.post(
-            f"{API_URL}/score-cv-match",
-            json={
-                "cv_analysis": cv_analysis,
-                "job_requirements": job_requirements
-            }
-        )
+def analyze_job_vacancy(
+    vacancy_text: str, previous_id: Optional[str] = None, near_duplicates: str = "offer"
+) -> Dict[str, Any]:
+    """Send job vacancy text to the API for analysis; previous_id lets it re-extract only the edits"""
+    async def post() -> Dict[str, Any]:
+        response = await api.client.post("/analyze-job-vacancy", json={
+            "vacancy_text": vacancy_text, "previous_id": previous_id, "near_duplicates": near_duplicates,
+        })
         response.raise_for_status()
-        return response.json()
+        result = response.json()
+        if offered := near_duplicate(response):
+            result["near_duplicate"] = offered
+        return result
+
+    try:
+        api = api_client()
+        return api.run(post())
     except Exception as e:
-        st.error(f"Error getting matching score: {str(e)}")
+        st.error(f"Error analyzing job vacancy: {str(e)}")
         return None
 
-# --- Caching for performance ---
-@cache_data(show_spinner=False)
-def cached_analyze_cv(file_bytes: bytes, filename: str):
-    return analyze_cv(file_bytes, filename)
+async def _events(api: ApiClient, path: str, **kwargs):
+    async with api.client.stream("POST", path, **kwargs) as response:
+        response.raise_for_status()
+        offered = near_duplicate(response)
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "error":
+                    raise RuntimeError(data.get("detail", "Unknown error"))
+                if offered:
+                    data["near_duplicate"] = offered
+                yield data, event == "complete"
 
-@cache_data(show_spinner=False)
-def cached_analyze_job_vacancy(job_text):
-    return analyze_job_vacancy(job_text)
+def stream_events(path: str, **kwargs) -> Iterator[Tuple[Dict[str, Any], bool]]:
+    """Yield (data, is_final) from a Server-Sent Events endpoint as results arrive"""
+    api = api_client()
+    return api.iterate(_events(api, path, **kwargs))
+
+async def _ndjson(api: ApiClient, path: str, **kwargs):
+    async with api.client.stream("POST", path, **kwargs) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.strip():
+                yield json.loads(line)
+
+def stream_vacancy_comparison(cv_analysis: Dict[str, Any], vacancy_texts: List[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Score the CV against several vacancies in one batched call, yielding each
+    vacancy's provisional and then final result as it arrives
+    """
+    api = api_client()
+    return api.iterate(_ndjson(
+        api, "/compare-vacancies", json={"cv_analysis": cv_analysis, "vacancy_texts": vacancy_texts}
+    ))
+
+def split_vacancies(job_text: str) -> List[str]:
+    """Split pasted text into vacancies separated by lines of three or more dashes"""
+    vacancies, current = [], []
+    for line in job_text.splitlines():
+        if len(line.strip()) >= 3 and set(line.strip()) == {"-"}:
+            vacancies.append("\n".join(current))
+            current = []
+        else:
+            current.append(line)
+    vacancies.append("\n".join(current))
+    return [v.strip() for v in vacancies if v.strip()]
+
+def stream_cv_analysis(
+    file_bytes: bytes,
+    filename: str,
+    input_mode: str = "pdf",
+    previous_id: Optional[str] = None,
+    near_duplicates: str = "offer",
+) -> Iterator[Tuple[Dict[str, Any], bool]]:
+    """Upload a CV and stream its analysis; previous_id lets the backend re-analyze only changed sections"""
+    files = {"file": (filename, file_bytes, "application/pdf")}
+    params = {"input_mode": input_mode, "near_duplicates": near_duplicates}
+    if previous_id:
+        params["previous_id"] = previous_id
+    return stream_events("/analyze-cv/stream", files=files, params=params)
 
+def stream_matching_score(cv_analysis: Dict[str, Any], job_requirements: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], bool]]:
+    """Stream the matching score between CV and job requirements"""
+    return stream_events(
+        "/score-cv-match/stream",
+        json={
+            "cv_analysis": cv_analysis,
+            "job_requirements": job_requirements
+        }
+    )
+
+# --- Caching for performance ---
 @cache_data(show_spinner=False)
-def cached_get_matching_score(cv_analysis, job_requirements):
-    return get_matching_score(cv_analysis, job_requirements)
+def cached_analyze_job_vacancy(job_text, previous_id=None, near_duplicates="offer"):
+    return analyze_job_vacancy(job_text, previous_id, near_duplicates)
 
-def display_analysis():
-    """Display the analysis results"""
-    if st.session_state.matching_score:
+def show_near_duplicate(analysis: Optional[Dict[str, Any]], kind: str):
+    """Tell the user when the backend answered with the analysis of a near-identical input"""
+    offered = (analysis or {}).get("near_duplicate")
+    if offered:
+        st.info(
+            f"This {kind} is {offered['similarity']:.0%} similar to one analyzed before, so that analysis was used. "
+            "If they differ in what matters, tick 'Always analyze from scratch' in the sidebar and analyze again."
+        )
+
+def display_analysis(score: Dict[str, Any] = None, partial: bool = False, key: Optional[str] = None):
+    """Display the analysis results, or a partial result while it streams in"""
+    if score is None:
         score = st.session_state.matching_score
-        
+    if score:
         # Overall score card
         with st.container():
             st.header("Match Analysis")
@@ -138,28 +255,75 @@ def display_analysis():
                     st.write(suggestion)
         
         # Download analysis results
-        if score:
+        if not partial:
             st.download_button(
                 label="Download Analysis as JSON",
-                data=str(score),
+                data=json.dumps(score, indent=2),
                 file_name="analysis_result.json",
-                mime="application/json"
+                mime="application/json",
+                key=key
             )
 
-def display_cv_analysis():
-    """Display CV analysis results"""
-    if 'cv_analysis' not in st.session_state or st.session_state.cv_analysis is None:
+def vacancy_title(vacancy_text: str) -> str:
+    return next((line.strip() for line in vacancy_text.splitlines() if line.strip()), "Vacancy")[:60]
+
+def rank_vacancies(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Vacancies by overall score, best first; pending and failed ones last"""
+    return sorted(results, key=lambda result: -(result.get("matching_score") or {}).get("overall_score", -1))
+
+def display_vacancy_table(results: List[Dict[str, Any]]):
+    """Display the ranked comparison table"""
+    rows = []
+    for rank, result in enumerate(rank_vacancies(results), 1):
+        score = result.get("matching_score") or {}
+        if "error" in result:
+            status = "Failed"
+        elif not score:
+            status = "Pending"
+        else:
+            status = "Final" if result.get("final") else "Provisional"
+        rows.append({
+            "Rank": rank,
+            "Vacancy": vacancy_title(result["vacancy"]),
+            "Overall": score.get("overall_score"),
+            "Skills": score.get("skills_match"),
+            "Experience": score.get("experience_match"),
+            "Missing": len(score.get("missing_requirements", [])) if score else None,
+            "Status": status,
+        })
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+
+def display_vacancy_results(results: List[Dict[str, Any]] = None):
+    """Display the ranked comparison of several vacancies, with the full match for each"""
+    if results is None:
+        results = st.session_state.vacancy_results
+    st.header("Vacancy Comparison")
+    display_vacancy_table(results)
+    ranked = rank_vacancies(results)
+    labels = [f"{rank}. {vacancy_title(result['vacancy'])[:30]}" for rank, result in enumerate(ranked, 1)]
+    # Tabs rather than expanders, since the analysis view has expanders of its own
+    for rank, (tab, result) in enumerate(zip(st.tabs(labels), ranked), 1):
+        with tab:
+            if "error" in result:
+                st.error(f"Error analyzing this vacancy: {result['error']}")
+            elif result.get("matching_score"):
+                display_analysis(result["matching_score"], partial=not result.get("final"), key=f"vacancy_{rank}")
+
+def display_cv_analysis(cv_analysis: Dict[str, Any] = None):
+    """Display CV analysis results, or a partial analysis while it streams in"""
+    if cv_analysis is None:
+        cv_analysis = st.session_state.get('cv_analysis')
+    if cv_analysis is None:
         st.warning("No CV analysis available. Please upload and analyze a CV first.")
         return
     
-    cv_analysis = st.session_state.cv_analysis
-    
     # Check if cv_analysis is a dictionary and has the expected structure
     if not isinstance(cv_analysis, dict):
         st.error("Invalid CV analysis format. Please try analyzing your CV again.")
         return
     
     st.header("CV Analysis Results")
+    show_near_duplicate(cv_analysis, "CV")
     
     # Main details in expander
     with st.expander("View Full CV Analysis", expanded=True):
@@ -220,6 +384,15 @@ def main():
 
     All analysis is local and sent securely to your FastAPI backend running at localhost:8000.
     """)
+    input_mode = st.sidebar.radio(
+        "Send CV to the model as",
+        ["pdf", "text"],
+        format_func=lambda mode: "Original PDF" if mode == "pdf" else "Extracted text (faster, fewer tokens)",
+    )
+    near_duplicates = "off" if st.sidebar.checkbox(
+        "Always analyze from scratch",
+        help="Do not use the analysis of a near-identical CV or vacancy analyzed before",
+    ) else "offer"
     
     # --- Add st.info at the top for user guidance ---
     st.info("Upload your CV and optionally a job description to analyze your fit for a role.")
@@ -259,7 +432,21 @@ def main():
                     saved_filename = save_uploaded_cv(uploaded_file)
                     st.success(f"CV saved as {saved_filename}")
                 with st.spinner("Analyzing CV..."):
-                    cv_analysis = cached_analyze_cv(file_bytes, filename)
+                    # Render partial results as the backend streams them
+                    placeholder = st.empty()
+                    cv_analysis = None
+                    # The last analysis is the baseline for an edited version of the same CV
+                    previous_id = (st.session_state.cv_analysis or {}).get("analysis_id")
+                    try:
+                        for data, final in stream_cv_analysis(
+                            file_bytes, filename, input_mode, previous_id, near_duplicates
+                        ):
+                            with placeholder.container():
+                                display_cv_analysis(data)
+                            if final:
+                                cv_analysis = data
+                    except Exception as e:
+                        st.error(f"Error analyzing CV: {str(e)}")
                     if cv_analysis and isinstance(cv_analysis, dict):
                         st.session_state.cv_analysis = cv_analysis
                         st.session_state.cv_analyzed = True
@@ -276,29 +463,72 @@ def main():
     with tab2:
         st.subheader("2. Optional: Add Job Description for Matching")
         job_text = st.text_area(
-            "Paste the job description here (optional)",
+            "Paste the job description here (optional); separate several vacancies with a line of ---",
             placeholder="Paste the job description to see how well your CV matches...",
             height=200,
             key="job_text"
         )
+        vacancy_files = st.file_uploader(
+            "Or upload vacancies to compare (one per file)",
+            type=["txt", "md"],
+            accept_multiple_files=True,
+            key="vacancy_uploader"
+        )
+        vacancies = split_vacancies(job_text) + [
+            text for text in (f.getvalue().decode("utf-8", errors="replace").strip() for f in vacancy_files or [])
+            if text
+        ]
 
         analyze_job_btn = st.button("Analyze Job Match")
         if analyze_job_btn:
             if not st.session_state.get('cv_analyzed') or 'cv_analysis' not in st.session_state:
                 st.warning("Please analyze your CV first")
-            elif not job_text.strip():
+            elif not vacancies:
                 st.warning("Please enter a job description")
+            elif len(vacancies) > 1:
+                with st.spinner(f"Comparing {len(vacancies)} vacancies..."):
+                    # All vacancies go in one call; the table re-ranks as scores arrive
+                    placeholder = st.empty()
+                    results = [{"vacancy": text} for text in vacancies]
+                    try:
+                        for line in stream_vacancy_comparison(st.session_state.cv_analysis, vacancies):
+                            result = results[line["index"]]
+                            result.update(analysis_id=line["analysis_id"], final=line["final"])
+                            if "error" in line:
+                                result["error"] = line["error"]
+                            else:
+                                result["matching_score"] = line["result"]
+                            with placeholder.container():
+                                display_vacancy_table(results)
+                    except Exception as e:
+                        st.error(f"Error comparing vacancies: {str(e)}")
+                    if any(result.get("matching_score") for result in results):
+                        st.session_state.vacancy_results = results
+                        st.session_state.matching_score = None
+                        st.toast("Vacancy comparison complete!", icon="🎯")
+                        st.rerun()
+                    else:
+                        st.error("Failed to compare vacancies. Please try again.")
             else:
                 with st.spinner("Analyzing job requirements and calculating match..."):
-                    job_req = cached_analyze_job_vacancy(job_text)
+                    previous_id = (st.session_state.job_requirements or {}).get("analysis_id")
+                    job_req = cached_analyze_job_vacancy(vacancies[0], previous_id, near_duplicates)
                     if job_req and isinstance(job_req, dict):
                         st.session_state.job_requirements = job_req
-                        matching_score = cached_get_matching_score(
-                            st.session_state.cv_analysis,
-                            job_req
-                        )
+                        # The local provisional score arrives first, then the model's feedback
+                        placeholder = st.empty()
+                        matching_score = None
+                        try:
+                            for data, final in stream_matching_score(st.session_state.cv_analysis, job_req):
+                                with placeholder.container():
+                                    display_analysis(data, partial=not final)
+                                if final:
+                                    matching_score = data
+                        except Exception as e:
+                            st.error(f"Error getting matching score: {str(e)}")
                         if matching_score and isinstance(matching_score, dict):
                             st.session_state.matching_score = matching_score
+                            st.session_state.vacancy_results = None
                             st.success("Job match analysis complete!")
                             st.toast("Job match complete!", icon="🎯")
                             st.rerun()
@@ -310,7 +540,11 @@ def main():
     # Display results if available
     if st.session_state.matching_score:
         st.write("---")
+        show_near_duplicate(st.session_state.job_requirements, "vacancy")
         display_analysis()
+    elif st.session_state.get('vacancy_results'):
+        st.write("---")
+        display_vacancy_results()
 
 if __name__ == "__main__":
     main()
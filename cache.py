@@ -0,0 +1,171 @@
+import hashlib
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed cache for agent results.
+
+    Entries live in a SQLite database so every API worker on the host shares
+    them. The cache is bounded both by age (TTL) and by entry count, evicting
+    the least recently used entries first. Hit/miss counters are stored in the
+    same database, so they also cover all workers.
+
+    Eviction runs every evict_every writes of a process rather than on each
+    one (by default every 1% of max_entries, at most 100), so the entry count
+    can briefly exceed max_entries by that many entries per worker.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        evict_every: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evict_every = evict_every or max(1, min(100, max_entries // 100))
+        self._writes = itertools.count(1)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " namespace TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Build a stable key from bytes, strings or JSON-serializable parts
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, (bytes, bytearray, memoryview)):
+                data = bytes(part)
+            elif isinstance(part, str):
+                data = part.encode("utf-8")
+            else:
+                data = json.dumps(part, sort_keys=True, default=str).encode("utf-8")
+            # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _count(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str, namespace: str = "default", count: bool = True) -> Optional[str]:
+        """
+        Return the cached value for key, or None on a miss or expired entry.
+        With count=False the lookup is left out of the hit/miss counters.
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > self.ttl_seconds:
+            if count:
+                self._count(conn, f"{namespace}:misses")
+            return None
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        if count:
+            self._count(conn, f"{namespace}:hits")
+        return row[0]
+
+    def set(self, key: str, value: str, namespace: str = "default") -> None:
+        """
+        Store a value, periodically evicting expired or least recently used entries
+        """
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO entries (key, namespace, value, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, namespace, value, now, now),
+        )
+        # itertools.count is atomic under the GIL, so threads share it safely
+        if next(self._writes) % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Delete expired entries, then the least recently used ones above max_entries
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def values(self, namespace: str, since: Optional[float] = None) -> Iterator[tuple[str, str]]:
+        """
+        Iterate over (key, value) pairs of unexpired entries in a namespace,
+        optionally only those stored at or after the since timestamp
+        """
+        conn = self._connect()
+        cutoff = max(time.time() - self.ttl_seconds, since or 0.0)
+        yield from conn.execute(
+            "SELECT key, value FROM entries WHERE namespace = ? AND created_at >= ?",
+            (namespace, cutoff),
+        )
+
+    def clear(self) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM counters")
+
+    def stats(self) -> dict:
+        """
+        Return entry counts and hit/miss counters per namespace
+        """
+        conn = self._connect()
+        stats: dict[str, dict[str, int]] = {}
+        for namespace, entries in conn.execute("SELECT namespace, COUNT(*) FROM entries GROUP BY namespace"):
+            stats.setdefault(namespace, {"entries": 0, "hits": 0, "misses": 0})["entries"] = entries
+        for name, value in conn.execute("SELECT name, value FROM counters"):
+            namespace, _, counter = name.rpartition(":")
+            stats.setdefault(namespace, {"entries": 0, "hits": 0, "misses": 0})[counter] = value
+        return {
+            "path": str(self.path),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "namespaces": stats,
+        }
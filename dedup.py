@@ -0,0 +1,120 @@
+import base64
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+_WORD = re.compile(r"\w+")
+
+# Largest prime below 2**32: hash values and coefficients stay below it, so
+# a * x + b never overflows 64 bits
+_PRIME = 4294967291
+
+Signature = np.ndarray
+
+
+class Fingerprint(BaseModel):
+    """MinHash signature of an analyzed input, kept so the index survives restarts."""
+    # Base64 of the little-endian uint32 signature; about half the size of a JSON list
+    signature: str
+
+    @classmethod
+    def of(cls, signature: Signature) -> "Fingerprint":
+        return cls(signature=base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii"))
+
+    def to_signature(self) -> Signature:
+        return np.frombuffer(base64.b64decode(self.signature), dtype="<u4").astype(np.uint32)
+
+
+class MinHashIndex:
+    """
+    Near-duplicate index over analyzed texts. Each text is reduced to the
+    MinHash signature of its word shingles; locality-sensitive hashing over
+    bands of the signature finds candidates with a few dict lookups, so query
+    cost does not grow with the number of indexed documents.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._signatures
+
+    def signature(self, text: str) -> Optional[Signature]:
+        """
+        MinHash signature of the text's word shingles (case and punctuation
+        ignored), or None if the text has no words
+        """
+        words = _WORD.findall(text.lower())
+        if not words:
+            return None
+        k = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def add(self, doc_id: str, signature: Signature | List[int]) -> None:
+        if doc_id in self._signatures:
+            return
+        signature = np.asarray(signature, dtype=np.uint32)
+        self._signatures[doc_id] = signature
+        for band, bucket in enumerate(self._buckets):
+            bucket.setdefault(signature[band * self.rows:(band + 1) * self.rows].tobytes(), []).append(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for band, bucket in enumerate(self._buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            ids = bucket.get(key, [])
+            if doc_id in ids:
+                ids.remove(doc_id)
+            if not ids:
+                bucket.pop(key, None)
+
+    def matches(self, signature: Signature, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Indexed documents at or above the threshold as (doc_id, estimated
+        Jaccard similarity), most similar first
+        """
+        candidates = set()
+        for band, bucket in enumerate(self._buckets):
+            candidates.update(bucket.get(signature[band * self.rows:(band + 1) * self.rows].tobytes(), ()))
+        candidates.discard(exclude)
+        found = []
+        for doc_id in candidates:
+            similarity = float(np.mean(self._signatures[doc_id] == signature))
+            if similarity >= self.threshold:
+                found.append((doc_id, similarity))
+        return sorted(found, key=lambda match: match[1], reverse=True)
+
+    def query(self, signature: Signature, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Most similar indexed document at or above the threshold, or None
+        """
+        found = self.matches(signature, exclude)
+        return found[0] if found else None
@@ -0,0 +1,172 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+from models import CVAnalysis, JobRequirements
+
+# Common CV section headings (matched case-insensitively, with an optional colon)
+_CV_HEADINGS = re.compile(
+    r"^(summary|profile|about( me)?|objective|(work |professional )?experience|employment( history)?|"
+    r"education|(technical |core |key )?skills|competenc(e|ies)|languages?|certifications?|certificates|"
+    r"licen[cs]es|projects|publications|courses|training|awards|achievements|volunteering|"
+    r"interests|hobbies|references|contact( details)?|personal (details|information))\s*:?$",
+    re.IGNORECASE,
+)
+_BULLET = re.compile(r"^\s*([-*•▪◦·]|\d+[.)])\s*")
+_SENTENCE_END = re.compile(r"(?<=[.;!?])\s+(?=[A-Z])")
+
+# Above this share of changed sections or requirements the input is treated
+# as a different document and analyzed from scratch
+MAX_CHANGED_SHARE = 0.5
+
+
+class Snapshot(BaseModel):
+    """Parts of an analyzed document (CV sections or vacancy requirements) by key."""
+    parts: Dict[str, str]
+
+
+@dataclass
+class PartDiff:
+    changed: Dict[str, str] = field(default_factory=dict)
+    added: Dict[str, str] = field(default_factory=dict)
+    removed: Dict[str, str] = field(default_factory=dict)
+    unchanged: Dict[str, str] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.added or self.removed)
+
+    def share_of(self, previous: Snapshot) -> float:
+        total = max(1, len(previous.parts) + len(self.added))
+        return (len(self.changed) + len(self.added) + len(self.removed)) / total
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _is_heading(line: str, first: bool = False) -> bool:
+    if _CV_HEADINGS.match(line):
+        return True
+    # Short all-caps lines such as "WORK HISTORY" are headings too, except the
+    # first line, which is usually the candidate's name
+    return (
+        not first and 3 <= len(line) <= 40 and len(line.split()) <= 4 and line.isupper() and not line.endswith(".")
+    )
+
+
+def split_sections(text: str) -> Snapshot:
+    """
+    Split extracted CV text into sections by their headings; text before the
+    first heading becomes the 'header' section
+    """
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    first = True
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and _is_heading(stripped, first):
+            title = stripped.rstrip(":").strip().lower()
+            current, n = title, 2
+            while current in sections:
+                current, n = f"{title} ({n})", n + 1
+            sections[current] = []
+        else:
+            sections[current].append(stripped)
+        first = first and not stripped
+    return Snapshot(parts={
+        title: "\n".join(lines).strip() for title, lines in sections.items() if "\n".join(lines).strip()
+    })
+
+
+def split_requirements(text: str) -> Snapshot:
+    """
+    Split vacancy text into requirement items: bullet points, lines and sentences
+    """
+    parts = {}
+    for line in text.splitlines():
+        line = _BULLET.sub("", line).strip()
+        for item in _SENTENCE_END.split(line):
+            if item.strip():
+                parts.setdefault(_normalize(item), item.strip())
+    return Snapshot(parts=parts)
+
+
+def diff(previous: Snapshot, current: Snapshot) -> PartDiff:
+    """
+    Compare two snapshots, ignoring whitespace and case
+    """
+    result = PartDiff()
+    for key, text in current.parts.items():
+        if key not in previous.parts:
+            result.added[key] = text
+        elif _normalize(previous.parts[key]) != _normalize(text):
+            result.changed[key] = text
+        else:
+            result.unchanged[key] = text
+    for key, text in previous.parts.items():
+        if key not in current.parts:
+            result.removed[key] = text
+    return result
+
+
+def cv_update_prompt(previous: CVAnalysis, changes: PartDiff) -> str:
+    """
+    Ask for an updated analysis from the previous one and the changed sections only
+    """
+    blocks = [f"## {title} (changed)\n{text}" for title, text in changes.changed.items()]
+    blocks += [f"## {title} (new)\n{text}" for title, text in changes.added.items()]
+    blocks += [f"## {title} (removed)\n{text}" for title, text in changes.removed.items()]
+    return (
+        "A candidate edited their CV. Below are the previous analysis and only the CV sections that "
+        "changed. Return the complete updated analysis: apply what the changed, new and removed sections "
+        "add or take away, and keep every other field exactly as it was.\n"
+        f"Previous analysis:\n{previous.to_prompt()}\n"
+        "Changed sections:\n" + "\n\n".join(blocks)
+    )
+
+
+# Fields that come from sections of their own (and possibly the untitled
+# header), recognized by these keywords in the section title, in English,
+# Dutch, German, French and Spanish
+_FIELD_SECTIONS = {
+    "languages": ("language", "taal", "talen", "sprach", "langue", "idioma"),
+    "certifications": ("certif", "licen", "course", "training", "cursus", "zertifi", "schulung", "formation"),
+}
+
+
+def merge_cv(previous: CVAnalysis, updated: CVAnalysis, changes: PartDiff) -> CVAnalysis:
+    """
+    Merge an updated analysis into the previous one. A field is kept from the
+    previous analysis, even if the model rephrased it, only when the CV has a
+    recognized section for it and neither that section nor the header changed;
+    otherwise the model's value is taken, since the edit may be in a section
+    whose title is not recognized.
+    """
+    edited = [*changes.changed, *changes.added, *changes.removed]
+    keep = {}
+    for name, keywords in _FIELD_SECTIONS.items():
+        def own(title: str) -> bool:
+            return any(keyword in title for keyword in keywords)
+
+        if any(own(title) for title in changes.unchanged) and not any(
+            own(title) or title == "header" for title in edited
+        ):
+            keep[name] = getattr(previous, name)
+    return updated.model_copy(update=keep)
+
+
+def job_update_prompt(previous: JobRequirements, changes: PartDiff) -> str:
+    """
+    Ask for updated requirements from the previous ones and the edited vacancy items only
+    """
+    lines = [f"+ {text}" for text in list(changes.added.values()) + list(changes.changed.values())]
+    lines += [f"- {text}" for text in changes.removed.values()]
+    return (
+        "A recruiter edited a job vacancy. Below are the previously extracted requirements and the "
+        "vacancy lines that were added (+) or removed (-). Return the complete updated requirements: "
+        "apply the edits and keep everything else exactly as it was.\n"
+        f"Previous requirements:\n{previous.to_prompt()}\n"
+        "Edits:\n" + "\n".join(lines)
+    )
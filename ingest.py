@@ -0,0 +1,177 @@
+"""
+Bulk-analyze every PDF in the CV folder.
+
+Files are hashed (and, in text mode, parsed) in a process pool, CVs that are
+already in the analysis store are skipped, and model calls run through a
+bounded semaphore. Progress is checkpointed after every file so an
+interrupted run resumes where it stopped.
+
+    python ingest.py --dir uploaded_cvs --concurrency 4 --input-mode text
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional, Tuple
+
+from cache import ResultCache
+from pdf_text import extract_text
+
+CV_DIR = "uploaded_cvs"
+
+
+def _prepare(path: str, input_mode: str, cache_path: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Hash a CV in a worker process; in text mode also extract and cache its text.
+    Returns (path, digest, error).
+    """
+    try:
+        if input_mode == "text":
+            digest, _ = extract_text(Path(path), ResultCache(cache_path))
+        else:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            digest = digest.hexdigest()
+        return path, digest, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+class Checkpoint:
+    """Completed and failed files of a run, persisted after every update."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        data = json.loads(path.read_text()) if path.exists() else {}
+        self.done: dict = data.get("done", {})
+        self.failed: dict = data.get("failed", {})
+
+    def mark(self, digest: str, filename: str, error: Optional[str] = None) -> None:
+        if error is None:
+            self.done[digest] = filename
+            self.failed.pop(digest, None)
+        else:
+            self.failed[digest] = {"file": filename, "error": error}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"done": self.done, "failed": self.failed}, indent=2))
+        # Atomic replace, so a crash never leaves a truncated checkpoint
+        os.replace(tmp, self.path)
+
+
+class Progress:
+    """Prints throughput, error count and ETA as files complete."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.finished = 0
+        self.analyzed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def update(self, status: str, filename: str) -> None:
+        self.finished += 1
+        if status == "skipped":
+            self.skipped += 1
+        elif status == "error":
+            self.errors += 1
+        else:
+            self.analyzed += 1
+        elapsed = time.monotonic() - self.started
+        rate = (self.analyzed + self.errors) / elapsed if elapsed else 0.0
+        remaining = self.total - self.finished
+        eta = str(timedelta(seconds=round(remaining / rate))) if rate else "?"
+        width = len(str(self.total))
+        print(
+            f"[{self.finished:>{width}}/{self.total}] {status:<8} {filename} | "
+            f"{rate * 60:.1f} CVs/min, {self.errors} errors, ETA {eta}",
+            flush=True,
+        )
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (
+            f"Analyzed {self.analyzed}, skipped {self.skipped}, failed {self.errors} "
+            f"of {self.total} files in {timedelta(seconds=round(elapsed))}"
+        )
+
+
+async def ingest(
+    cv_dir: Path,
+    concurrency: int = 4,
+    workers: Optional[int] = None,
+    input_mode: str = "pdf",
+    checkpoint_path: Optional[Path] = None,
+) -> Progress:
+    """
+    Analyze every PDF in cv_dir that has not been analyzed yet
+    """
+    # Imported here so `--help` does not configure agents and logging
+    from agents import analysis_store, analyze_cv, result_cache
+    from models import CVAnalysis
+
+    files = sorted(p for p in cv_dir.iterdir() if p.suffix.lower() == ".pdf")
+    checkpoint = Checkpoint(checkpoint_path or cv_dir / ".ingest_checkpoint.json")
+    progress = Progress(len(files))
+    semaphore = asyncio.Semaphore(concurrency)
+    scheduled = set()
+
+    async def analyze(path: Path, digest: str) -> None:
+        async with semaphore:
+            try:
+                await analyze_cv(path, digest, input_mode, digest=digest)
+            except Exception as e:
+                checkpoint.mark(digest, path.name, str(e))
+                progress.update("error", f"{path.name}: {e}")
+                return
+        checkpoint.mark(digest, path.name)
+        progress.update("analyzed", path.name)
+
+    loop = asyncio.get_running_loop()
+    tasks = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        prepared = [
+            loop.run_in_executor(pool, _prepare, str(path), input_mode, str(result_cache.path))
+            for path in files
+        ]
+        for next_done in asyncio.as_completed(prepared):
+            path, digest, error = await next_done
+            path = Path(path)
+            if error is not None:
+                progress.update("error", f"{path.name}: {error}")
+            elif (
+                digest in scheduled
+                or digest in checkpoint.done
+                or analysis_store.get("cv", digest, CVAnalysis) is not None
+            ):
+                progress.update("skipped", path.name)
+            else:
+                scheduled.add(digest)
+                tasks.append(asyncio.create_task(analyze(path, digest)))
+    await asyncio.gather(*tasks)
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-analyze the PDFs in the CV folder")
+    parser.add_argument("--dir", type=Path, default=Path(CV_DIR), help="Folder with CV PDFs")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent model calls")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for hashing and parsing")
+    parser.add_argument("--input-mode", choices=["pdf", "text"], default=os.getenv("RESUME_CV_INPUT_MODE", "pdf"))
+    parser.add_argument("--checkpoint", type=Path, default=None, help="Checkpoint file (default: <dir>/.ingest_checkpoint.json)")
+    args = parser.parse_args()
+
+    progress = asyncio.run(ingest(args.dir, args.concurrency, args.workers, args.input_mode, args.checkpoint))
+    print(progress.summary())
+
+
+if __name__ == "__main__":
+    main()
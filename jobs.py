@@ -0,0 +1,366 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from policy import CircuitOpen, Overloaded
+
+logger = logging.getLogger(__name__)
+
+# Job states; 'queued' jobs whose run_after has passed are picked up by workers
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+Handler = Callable[[dict, Optional[bytes]], Awaitable[Any]]
+
+
+class JobQueue:
+    """
+    Persistent priority queue for long-running analyses.
+
+    Jobs live in a SQLite database, so they survive restarts and every API
+    worker on the host can enqueue and process them. A running job holds a
+    lease; if its worker dies, the job is picked up again once the lease
+    expires. Failed attempts are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_attempts: int = 3,
+        lease_seconds: float = 600,
+        retry_delay: float = 5.0,
+        retention_seconds: float = 7 * 24 * 3600,
+        callback_hosts: Optional[Collection[str]] = None,
+        allow_private_callbacks: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.retention_seconds = retention_seconds
+        # Callback receivers: only these hosts when set, otherwise any public host
+        self.callback_hosts = {host.lower() for host in callback_hosts} if callback_hosts else None
+        self.allow_private_callbacks = allow_private_callbacks
+        self._local = threading.local()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._callbacks: set = set()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " priority INTEGER NOT NULL DEFAULT 0,"
+                " params TEXT NOT NULL,"
+                " payload BLOB,"
+                " callback_url TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " run_after REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, created_at)")
+            # Every submission of a job can ask for its own callback
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS callbacks ("
+                " job_id TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, url))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def enqueue(
+        self,
+        job_id: str,
+        kind: str,
+        params: dict,
+        payload: Optional[bytes] = None,
+        priority: int = 0,
+        callback_url: Optional[str] = None,
+    ) -> dict:
+        """
+        Queue a job and return its status. Re-submitting a job ID that is
+        queued, running or done returns the existing job instead of redoing
+        the work; a failed job is queued again. Every submission's callback_url
+        is notified when the job finishes, straight away if it already has;
+        call from the event loop so that notification can be scheduled.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] == FAILED:
+                conn.execute(
+                    "INSERT OR REPLACE INTO jobs (id, kind, status, priority, params, payload, callback_url,"
+                    " attempts, result, error, created_at, updated_at, run_after)"
+                    " VALUES (?, ?, ?, ?, ?, ?, NULL, 0, NULL, NULL, ?, ?, ?)",
+                    (job_id, kind, QUEUED, priority, json.dumps(params), payload, now, now, now),
+                )
+            elif row["status"] == QUEUED and priority > 0:
+                # A more urgent re-submission bumps the waiting job
+                conn.execute("UPDATE jobs SET priority = MAX(priority, ?) WHERE id = ?", (priority, job_id))
+            if callback_url:
+                conn.execute("INSERT OR IGNORE INTO callbacks (job_id, url) VALUES (?, ?)", (job_id, callback_url))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if self._wakeup is not None:
+            self._wakeup.set()
+        job = self.get(job_id)
+        if callback_url and job["status"] == DONE:
+            self._deliver([callback_url], job)
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Return a job's status, attempts, timestamps and, when finished, its result or error
+        """
+        row = self._connect().execute(
+            "SELECT id, kind, status, priority, attempts, result, error, created_at, updated_at"
+            " FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+    def claim(self) -> Optional[sqlite3.Row]:
+        """
+        Take the most urgent ready job (or one whose lease has expired) and lease it
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND run_after <= ?"
+                " ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, run_after = ? WHERE id = ?",
+                    (RUNNING, now, now + self.lease_seconds, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def complete(self, job_id: str, result: Any) -> None:
+        now = time.time()
+        # The PDF is no longer needed once the result is stored
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, payload = NULL, updated_at = ? WHERE id = ?",
+            (DONE, json.dumps(result), now, job_id),
+        )
+        self._purge(now)
+
+    def fail(self, job_id: str, attempts: int, error: str) -> bool:
+        """
+        Record a failed attempt; returns True if the job will be retried
+        """
+        now = time.time()
+        if attempts < self.max_attempts:
+            delay = self.retry_delay * 2 ** (attempts - 1) * random.uniform(0.8, 1.2)
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?, run_after = ? WHERE id = ?",
+                (QUEUED, error, now, now + delay, job_id),
+            )
+            return True
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, payload = NULL, updated_at = ? WHERE id = ?",
+            (FAILED, error, now, job_id),
+        )
+        self._purge(now)
+        return False
+
+    def defer(self, job_id: str, delay: float, error: str) -> None:
+        """
+        Put a job back in the queue for delay seconds without counting the attempt
+        """
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, attempts = attempts - 1, error = ?, updated_at = ?, run_after = ?"
+            " WHERE id = ?",
+            (QUEUED, error, now, now + delay, job_id),
+        )
+
+    def _purge(self, now: float) -> None:
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, now - self.retention_seconds),
+        )
+        conn.execute("DELETE FROM callbacks WHERE job_id NOT IN (SELECT id FROM jobs)")
+
+    def callback_urls(self, job_id: str) -> List[str]:
+        conn = self._connect()
+        urls = [url for (url,) in conn.execute("SELECT url FROM callbacks WHERE job_id = ?", (job_id,))]
+        # Jobs queued before callbacks got their own table keep theirs on the job
+        row = conn.execute("SELECT callback_url FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is not None and row["callback_url"] and row["callback_url"] not in urls:
+            urls.append(row["callback_url"])
+        return urls
+
+    def _deliver(self, urls: List[str], job: dict) -> None:
+        # In the background, so a slow receiver does not hold up the queue or the request
+        for url in urls:
+            task = asyncio.get_running_loop().create_task(self._notify(url, job))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    async def check_callback_url(self, callback_url: str) -> None:
+        """
+        Raise ValueError unless the URL is http(s) and its host is allowed: on
+        the callback host list when one is set, otherwise resolving only to
+        public addresses, so callbacks cannot reach internal services
+        """
+        try:
+            parts = urlsplit(callback_url)
+            port = parts.port
+        except ValueError as e:
+            raise ValueError(f"Invalid callback URL: {e}") from e
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Callback URL must be an http or https URL with a host")
+        host = parts.hostname.lower()
+        if self.callback_hosts is not None:
+            if host not in self.callback_hosts:
+                raise ValueError(f"Callback host {host} is not allowed")
+            return
+        if self.allow_private_callbacks:
+            return
+        try:
+            addresses = await asyncio.get_running_loop().getaddrinfo(
+                host, port or (443 if parts.scheme == "https" else 80)
+            )
+        except OSError as e:
+            raise ValueError(f"Callback host {host} does not resolve: {e}") from e
+        for *_, sockaddr in addresses:
+            # Scoped IPv6 addresses carry an interface suffix
+            if not ipaddress.ip_address(sockaddr[0].split("%")[0]).is_global:
+                raise ValueError(f"Callback host {host} resolves to a non-public address")
+
+    async def _notify(self, callback_url: str, job: dict) -> None:
+        import httpx
+
+        try:
+            # Checked again on delivery: settings may have changed since the
+            # job was queued, and DNS answers may have too
+            await self.check_callback_url(callback_url)
+        except ValueError as e:
+            logger.error(f"Not sending callback for job {job['job_id']}: {e}")
+            return
+        # Redirects are not followed, so a receiver cannot bounce the request elsewhere
+        async with httpx.AsyncClient(timeout=10, follow_redirects=False) as client:
+            for attempt in range(3):
+                try:
+                    response = await client.post(callback_url, json=job)
+                    if response.status_code < 500:
+                        return
+                except httpx.HTTPError as e:
+                    logger.warning(f"Callback for job {job['job_id']} failed: {e}")
+                await asyncio.sleep(2 ** attempt)
+        logger.error(f"Giving up on callback for job {job['job_id']} to {callback_url}")
+
+    async def work(self, handlers: Dict[str, Handler], poll_interval: float = 1.0) -> None:
+        """
+        Process jobs until cancelled; run several of these for a worker pool
+        """
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while True:
+            row = self.claim()
+            if row is None:
+                # Sleep until a local enqueue or the next poll (for other workers' jobs and retries)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id = row["id"]
+            try:
+                output = await handlers[row["kind"]](json.loads(row["params"]), row["payload"])
+                self.complete(job_id, output)
+            except asyncio.CancelledError:
+                # Shutting down: hand the job back without counting the attempt
+                self._connect().execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts - 1, run_after = ? WHERE id = ?",
+                    (QUEUED, time.time(), job_id),
+                )
+                raise
+            except (Overloaded, CircuitOpen) as e:
+                # Overload or an open breaker says nothing about the job itself:
+                # wait until the policy expects capacity, without using up an attempt
+                delay = e.retry_after if e.retry_after is not None else self.retry_delay
+                logger.warning(f"Job {job_id} ({row['kind']}) deferred for {delay:.1f}s: {e}")
+                self.defer(job_id, delay, str(e))
+                continue
+            except Exception as e:
+                logger.error(f"Job {job_id} ({row['kind']}) attempt {row['attempts'] + 1} failed: {e}")
+                if self.fail(job_id, row["attempts"] + 1, str(e)):
+                    continue
+            self._deliver(self.callback_urls(job_id), self.get(job_id))
+
+
+def main() -> None:
+    """
+    Run a standalone job worker, e.g. with RESUME_JOB_WORKERS=0 on the API
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Process queued analysis jobs")
+    parser.add_argument("--workers", type=int, default=2, help="Jobs processed concurrently")
+    args = parser.parse_args()
+
+    # Imported here so `--help` does not configure agents and logging
+    from agents import job_handlers, job_queue
+
+    async def run() -> None:
+        await asyncio.gather(*(job_queue.work(job_handlers) for _ in range(args.workers)))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from models import CVAnalysis, JobRequirements, MatchingScore
+
+# Canonical spellings for common abbreviations and variants. Keys and values
+# are already lowercased and whitespace-normalized.
+SYNONYMS = {
+    # Programming languages and runtimes
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "golang": "go",
+    "c sharp": "c#",
+    "csharp": "c#",
+    "cpp": "c++",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "node js": "node.js",
+    "reactjs": "react",
+    "react.js": "react",
+    "vuejs": "vue",
+    "vue.js": "vue",
+    "angularjs": "angular",
+    # Data and infrastructure
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "k8s": "kubernetes",
+    "aws": "amazon web services",
+    "gcp": "google cloud platform",
+    "google cloud": "google cloud platform",
+    "azure": "microsoft azure",
+    "ms excel": "excel",
+    "microsoft excel": "excel",
+    "ci/cd": "continuous integration",
+    "ci": "continuous integration",
+    # Disciplines
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "ux": "user experience",
+    "ui": "user interface",
+    # Languages written in their own language
+    "deutsch": "german",
+    "nederlands": "dutch",
+    "français": "french",
+    "francais": "french",
+    "español": "spanish",
+    "espanol": "spanish",
+    "italiano": "italian",
+    "português": "portuguese",
+    "portugues": "portuguese",
+}
+
+# Ordinal scale used to compare seniority levels
+SENIORITY_LEVELS = {
+    "intern": 0,
+    "trainee": 0,
+    "entry": 1,
+    "junior": 1,
+    "medior": 2,
+    "mid": 2,
+    "intermediate": 2,
+    "senior": 3,
+    "lead": 4,
+    "staff": 4,
+    "principal": 5,
+    "head": 5,
+    "director": 6,
+}
+
+# Relative weight of each category in the provisional overall score
+WEIGHTS = {"skills": 0.5, "experience": 0.25, "qualifications": 0.15, "languages": 0.1}
+
+_PARENTHESES = re.compile(r"\([^)]*\)")
+_SEPARATORS = re.compile(r"[\s_]+")
+_TRAILING = re.compile(r"^[\s\-•*:;,]+|[\s\-:;,.]+$")
+
+
+def _clean(term: str) -> str:
+    text = _PARENTHESES.sub(" ", term.lower())
+    return _TRAILING.sub("", _SEPARATORS.sub(" ", text))
+
+
+@lru_cache(maxsize=65536)
+def normalize_term(term: str) -> str:
+    """
+    Lowercase, strip qualifiers like "(fluent)" and map synonyms to a canonical form
+    """
+    text = _clean(term)
+    return SYNONYMS.get(text, text)
+
+
+@lru_cache(maxsize=65536)
+def _forms(term: str) -> frozenset[str]:
+    # Both the canonical and the literal spelling, so "AWS" still finds "AWS Certified"
+    forms = {normalize_term(term), _clean(term)}
+    forms.discard("")
+    forms.discard("not specified")
+    return frozenset(forms)
+
+
+def seniority_rank(level: Optional[str]) -> Optional[int]:
+    """
+    Map a free-text seniority level to an ordinal rank, or None if unknown
+    """
+    if not level:
+        return None
+    ranks = [rank for word, rank in SENIORITY_LEVELS.items() if re.search(rf"\b{word}\b", level.lower())]
+    return max(ranks) if ranks else None
+
+
+class _TermSet:
+    """Normalized terms of a candidate for exact and whole-word lookups."""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: set[str] = set()
+        for term in terms:
+            if term:
+                self.terms |= _forms(term)
+
+    def matches(self, requirement: str) -> bool:
+        forms = _forms(requirement)
+        if forms & self.terms:
+            return True
+        # A more specific candidate term satisfies a requirement it contains:
+        # "python programming" satisfies "python", but a generic "management"
+        # does not satisfy "product management". Words are delimited by
+        # spaces, slashes and commas only, so "go" does not match
+        # "go-to-market" and "asp" does not match "asp.net"
+        for req in forms:
+            if len(req) < 2:
+                continue
+            pattern = re.compile(rf"(?<![^\s/,]){re.escape(req)}(?![^\s/,])")
+            for term in self.terms:
+                if len(term) > len(req) and pattern.search(term):
+                    return True
+        return False
+
+
+def _split(requirements: List[str], candidate: _TermSet) -> tuple[List[str], List[str]]:
+    matched, missing = [], []
+    seen = set()
+    for requirement in requirements:
+        key = normalize_term(requirement)
+        if not key or key == "not specified" or key in seen:
+            continue
+        seen.add(key)
+        (matched if candidate.matches(requirement) else missing).append(requirement)
+    return matched, missing
+
+
+def _ratio(matched: List[str], missing: List[str]) -> Optional[int]:
+    total = len(matched) + len(missing)
+    return round(100 * len(matched) / total) if total else None
+
+
+def local_match(cv_analysis: CVAnalysis, job_requirements: JobRequirements) -> MatchingScore:
+    """
+    Compute a provisional MatchingScore from set overlaps without calling a model
+    """
+    skills = _TermSet(cv_analysis.skills)
+    languages = _TermSet(cv_analysis.languages)
+    credentials = _TermSet(cv_analysis.certifications + cv_analysis.skills)
+
+    matched_skills, missing_skills = _split(job_requirements.skills, skills)
+    matched_languages, missing_languages = _split(job_requirements.languages, languages)
+    matched_qualifications, missing_qualifications = _split(
+        job_requirements.certifications + job_requirements.qualifications, credentials
+    )
+
+    cv_rank = seniority_rank(cv_analysis.seniority_level)
+    job_rank = seniority_rank(job_requirements.seniority_level)
+    if cv_rank is None or job_rank is None:
+        experience_match = None
+    else:
+        experience_match = max(0, 100 - 35 * max(0, job_rank - cv_rank))
+
+    scores = {
+        "skills": _ratio(matched_skills, missing_skills),
+        "experience": experience_match,
+        "qualifications": _ratio(matched_qualifications, missing_qualifications),
+        "languages": _ratio(matched_languages, missing_languages),
+    }
+    known = {name: score for name, score in scores.items() if score is not None}
+    weight = sum(WEIGHTS[name] for name in known)
+    overall = round(sum(WEIGHTS[name] * score for name, score in known.items()) / weight) if weight else 0
+
+    skills_total = len(matched_skills) + len(missing_skills)
+    feedback = (
+        f"Provisional local match: {len(matched_skills)}/{skills_total} required skills, "
+        f"{len(matched_languages)}/{len(matched_languages) + len(missing_languages)} languages, "
+        f"{len(matched_qualifications)}/{len(matched_qualifications) + len(missing_qualifications)} "
+        f"qualifications and certifications found in the CV."
+    )
+    return MatchingScore(
+        overall_score=overall,
+        skills_match=scores["skills"] if scores["skills"] is not None else 100,
+        experience_match=experience_match if experience_match is not None else 50,
+        detailed_feedback=feedback,
+        missing_requirements=missing_skills + missing_languages + missing_qualifications,
+        improvement_suggestions=[],
+        matched_skills=matched_skills,
+        matched_qualifications=matched_qualifications,
+        matched_languages=matched_languages,
+    )
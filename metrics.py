@@ -0,0 +1,166 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import ContextManager, Dict, Iterator, List, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per million (input, output) tokens, used for cost estimates
+MODEL_PRICES = {
+    "openai:gpt-4o-mini": (0.15, 0.60),
+    "openai:gpt-4o": (2.50, 10.00),
+    "openai:gpt-4.1-mini": (0.40, 1.60),
+    "openai:gpt-4.1": (2.00, 8.00),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text format.
+    Needs no external service; each worker process keeps its own values.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """
+        Set a gauge, or mirror a counter that is maintained elsewhere
+        """
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            # Per-bucket counts followed by sum and count
+            series = self._histograms.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format
+        """
+        lines: List[str] = []
+        with self._lock:
+            series_by_name: Dict[str, List[str]] = {}
+            for (name, labels), value in list(self._counters.items()) + list(self._gauges.items()):
+                series_by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for (name, labels), series in self._histograms.items():
+                out = series_by_name.setdefault(name, [])
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    out.append(f"{name}_bucket{_format_labels(labels, (('le', repr(bound)),))} {_format_value(cumulative)}")
+                out.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {_format_value(series[-1])}")
+                out.append(f"{name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+                out.append(f"{name}_count{_format_labels(labels)} {_format_value(series[-1])}")
+        for name in sorted(series_by_name):
+            if name in self._meta:
+                kind, help_text = self._meta[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.extend(series_by_name[name])
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("resume_http_request_duration_seconds", "histogram", "HTTP request latency by route and status")
+metrics.describe("resume_stage_duration_seconds", "histogram", "Latency of pipeline stages by agent")
+metrics.describe("resume_agent_model_calls_total", "counter", "Model calls made by each agent")
+metrics.describe("resume_agent_tokens_total", "counter", "Tokens used by each agent")
+metrics.describe("resume_agent_cost_usd_total", "counter", "Estimated model cost in USD by agent")
+metrics.describe("resume_cache_hits_total", "counter", "Result cache hits (all workers)")
+metrics.describe("resume_cache_misses_total", "counter", "Result cache misses (all workers)")
+metrics.describe("resume_cache_hit_ratio", "gauge", "Result cache hit ratio (all workers)")
+metrics.describe("resume_cache_entries", "gauge", "Entries in the result cache")
+metrics.describe("resume_model_route_total", "counter", "Model tier routing decisions by agent, tier and outcome")
+metrics.describe("resume_model_tier_duration_seconds", "histogram", "Model call latency by agent and tier")
+metrics.describe("resume_policy_events_total", "counter", "Model call retries, timeouts, rejections and circuit breaker trips")
+metrics.describe("resume_jobs", "gauge", "Jobs in the job queue by status (all workers)")
+metrics.describe("resume_singleflight_shared_total", "counter", "Requests served by joining an identical in-flight call")
+metrics.describe("resume_incremental_total", "counter", "Re-analyses of edited CVs and vacancies by outcome (unchanged, partial or full)")
+metrics.describe("resume_near_duplicate_total", "counter", "Analyses served from a near-duplicate input by kind and mode")
+
+
+def stage(name: str, agent: str = "") -> ContextManager[None]:
+    """
+    Time one pipeline stage, e.g. `with stage("model_call", "scoring"):`
+    """
+    return metrics.timer("resume_stage_duration_seconds", stage=name, agent=agent)
+
+
+def record_usage(agent: str, model: str, usage) -> None:
+    """
+    Record token counts and estimated cost from a pydantic-ai Usage
+    """
+    request_tokens = usage.request_tokens or 0
+    response_tokens = usage.response_tokens or 0
+    metrics.inc("resume_agent_model_calls_total", agent=agent, model=model)
+    metrics.inc("resume_agent_tokens_total", request_tokens, agent=agent, kind="request")
+    metrics.inc("resume_agent_tokens_total", response_tokens, agent=agent, kind="response")
+    if model in MODEL_PRICES:
+        input_price, output_price = MODEL_PRICES[model]
+        cost = (request_tokens * input_price + response_tokens * output_price) / 1_000_000
+        metrics.inc("resume_agent_cost_usd_total", cost, agent=agent, model=model)
+
+
+def record_cache_stats(stats: dict) -> None:
+    """
+    Mirror ResultCache.stats() into gauges and counters before a scrape
+    """
+    for namespace, values in stats["namespaces"].items():
+        hits, misses = values.get("hits", 0), values.get("misses", 0)
+        metrics.set("resume_cache_hits_total", hits, namespace=namespace)
+        metrics.set("resume_cache_misses_total", misses, namespace=namespace)
+        metrics.set("resume_cache_entries", values.get("entries", 0), namespace=namespace)
+        if hits + misses:
+            metrics.set("resume_cache_hit_ratio", hits / (hits + misses), namespace=namespace)
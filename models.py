@@ -1,7 +1,39 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import ClassVar, Dict, List, Optional
 
-class JobRequirements(BaseModel):
+# Placeholder values that carry no information for the model
+_EMPTY_VALUES = {"", "none", "n/a", "not specified", "unknown"}
+
+def _compact_items(items: List[str]) -> List[str]:
+    """Collapse whitespace, drop placeholders and case-insensitive duplicates, keeping order"""
+    seen = set()
+    compact = []
+    for item in items:
+        item = " ".join(item.split())
+        if item.lower() not in _EMPTY_VALUES and item.lower() not in seen:
+            seen.add(item.lower())
+            compact.append(item)
+    return compact
+
+class PromptModel(BaseModel):
+    """Base for models that are embedded in prompts."""
+    # Field name -> short key used in the compact prompt encoding
+    prompt_keys: ClassVar[Dict[str, str]] = {}
+
+    def to_prompt(self) -> str:
+        """
+        Compact, token-minimal encoding: one `key: value` line per non-empty
+        field, with list items de-duplicated and joined by semicolons
+        """
+        lines = []
+        for field, key in self.prompt_keys.items():
+            value = getattr(self, field)
+            items = _compact_items(value if isinstance(value, list) else [value or ""])
+            if items:
+                lines.append(f"{key}: {'; '.join(items)}")
+        return "\n".join(lines)
+
+class JobRequirements(PromptModel):
     """Represents job requirements extracted from a job posting."""
     skills: List[str] = Field(default_factory=list, description="Required skills")
     experience: str = Field(..., description="Required years/type of experience")
@@ -11,8 +43,17 @@ class JobRequirements(BaseModel):
     responsibilities: List[str] = Field(default_factory=list, description="Key responsibilities or duties")
     seniority_level: Optional[str] = Field(None, description="Seniority level (e.g., junior, senior, lead)")
     model_config = {'strict': True}
+    prompt_keys: ClassVar[Dict[str, str]] = {
+        'skills': 'skills',
+        'experience': 'experience',
+        'qualifications': 'qualifications',
+        'certifications': 'certifications',
+        'languages': 'languages',
+        'responsibilities': 'duties',
+        'seniority_level': 'level',
+    }
 
-class CVAnalysis(BaseModel):
+class CVAnalysis(PromptModel):
     """Represents the analysis of a CV."""
     skills: List[str] = Field(default_factory=list, description="Skills found in the CV")
     experience_summary: str = Field(..., description="Summary of relevant experience")
@@ -24,6 +65,17 @@ class CVAnalysis(BaseModel):
     responsibilities: List[str] = Field(default_factory=list, description="Responsibilities held in previous roles")
     seniority_level: Optional[str] = Field(None, description="Seniority level inferred from CV")
     model_config = {'strict': True}
+    prompt_keys: ClassVar[Dict[str, str]] = {
+        'skills': 'skills',
+        'experience_summary': 'experience',
+        'certifications': 'certifications',
+        'languages': 'languages',
+        'responsibilities': 'duties',
+        'seniority_level': 'level',
+        'strengths': 'strengths',
+        'weaknesses': 'weaknesses',
+        'recommendations': 'recommendations',
+    }
 
 class MatchingScore(BaseModel):
     """Represents the matching score between a CV and job requirements."""
@@ -0,0 +1,98 @@
+import hashlib
+import io
+import json
+import mmap
+import re
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from cache import ResultCache
+
+# Bump when extraction or cleaning changes so stale cached text is ignored
+EXTRACTOR_VERSION = 1
+
+_PAGE_NUMBER = re.compile(r"^(page\s*)?\d+(\s*(of|/)\s*\d+)?$", re.IGNORECASE)
+_HYPHENATED_BREAK = re.compile(r"(\w)-\n(\w)")
+_SPACES = re.compile(r"[ \t ]+")
+
+
+@contextmanager
+def _buffer(source: Path | bytes) -> Iterator[bytes | mmap.mmap]:
+    """
+    Yield a read-only buffer over the PDF; files are memory-mapped rather than read
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield source
+        return
+    with open(source, "rb") as f:
+        if Path(source).stat().st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _extract_pages(buffer: bytes | mmap.mmap) -> List[str]:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("Text mode requires the 'pypdf' package (pip install pypdf)") from e
+    stream = buffer if isinstance(buffer, mmap.mmap) else io.BytesIO(buffer)
+    pages = []
+    for page in PdfReader(stream).pages:
+        try:
+            pages.append(page.extract_text() or "")
+        except Exception:
+            # A single unreadable page should not sink the whole CV
+            pages.append("")
+    return pages
+
+
+def clean_pages(pages: List[str]) -> str:
+    """
+    Normalize extracted page text and strip boilerplate: page numbers, running
+    headers/footers repeated on most pages, hyphenated line breaks and blank runs
+    """
+    page_lines = [
+        [_SPACES.sub(" ", line).strip() for line in _HYPHENATED_BREAK.sub(r"\1\2", page).splitlines()]
+        for page in pages
+    ]
+    repeated = set()
+    if len(page_lines) > 1:
+        counts = Counter(line for lines in page_lines for line in set(lines) if line)
+        repeated = {line for line, count in counts.items() if count > len(page_lines) / 2}
+
+    output: List[str] = []
+    for lines in page_lines:
+        for line in lines:
+            if not line:
+                if output and output[-1]:
+                    output.append("")
+            elif line not in repeated and not _PAGE_NUMBER.match(line):
+                output.append(line)
+    return "\n".join(output).strip()
+
+
+def extract_text(
+    source: Path | bytes, cache: Optional[ResultCache] = None, digest: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    Extract compact text from a PDF path or bytes.
+
+    Returns (sha256 of the PDF, cleaned text). Raw per-page text is cached by
+    file hash, so repeated extractions of the same file skip PDF parsing.
+    Callers that already hashed the PDF pass the digest to skip hashing it again.
+    """
+    with _buffer(source) as buffer:
+        digest = digest or hashlib.sha256(buffer).hexdigest()
+        key = ResultCache.make_key("pdf_text", EXTRACTOR_VERSION, digest)
+        cached = cache.get(key, "pdf_text") if cache is not None else None
+        if cached is not None:
+            pages = json.loads(cached)
+        else:
+            pages = _extract_pages(buffer)
+            if cache is not None:
+                cache.set(key, json.dumps(pages), "pdf_text")
+    return digest, clean_pages(pages)
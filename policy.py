@@ -0,0 +1,273 @@
+import asyncio
+import math
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from metrics import metrics
+
+T = TypeVar("T")
+
+
+class PolicyError(Exception):
+    """A model call refused or abandoned by the execution policy."""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Overloaded(PolicyError):
+    """Too many model calls are already waiting for a slot."""
+    status_code = 429
+
+
+class CircuitOpen(PolicyError):
+    """The provider failed repeatedly; calls fail fast until it recovers."""
+    status_code = 503
+
+
+class DeadlineExceeded(PolicyError):
+    """A model call did not finish within its deadline, which covers all its retries."""
+    status_code = 504
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Errors worth retrying: rate limits, provider 5xx, timeouts and connection failures
+    """
+    # Imported here so loading the policy does not pull in the model client stack
+    import httpx
+    from pydantic_ai.exceptions import ModelHTTPError
+
+    if isinstance(error, ModelHTTPError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    if isinstance(error, (TimeoutError, DeadlineExceeded, httpx.TransportError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.APIConnectionError, openai.APITimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures and rejects
+    calls for reset_seconds; after that, a single probe call is let through
+    and its outcome decides whether it closes again or stays open for
+    another period. Other calls are rejected while the probe runs.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.reset_seconds else "half_open"
+
+    def check(self, name: str, probe_seconds: float = 1.0) -> bool:
+        """
+        Raise CircuitOpen if the call may not go ahead; returns True when the
+        call is the half-open probe, which must be ended with end_probe()
+        """
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        if state == "open":
+            retry_after = self.reset_seconds - (time.monotonic() - self.opened_at)
+        else:
+            # The probe's outcome is known after about one call
+            retry_after = probe_seconds
+        raise CircuitOpen(f"Model provider {name} is unavailable; try again later", retry_after)
+
+    def end_probe(self) -> None:
+        # A probe that ended without a verdict (cancelled, or a non-transient
+        # error) lets the next call probe instead
+        self.probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ExecutionPolicy:
+    """
+    Shared limits for model calls: a global and per-agent concurrency budget,
+    a bounded wait queue, a deadline per call that covers its retries,
+    jittered retries on transient errors and a circuit breaker per model.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        agent_concurrency: Optional[Dict[str, int]] = None,
+        max_queued: int = 64,
+        timeout: float = 60.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.agent_concurrency = agent_concurrency or {}
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._agents: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._queued = 0
+        # Moving average of call duration, used to estimate Retry-After
+        self._mean_seconds = 1.0
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(self.breaker_failures, self.breaker_reset_seconds)
+        return self._breakers[name]
+
+    def _agent_semaphore(self, agent: str) -> asyncio.Semaphore:
+        if agent not in self._agents:
+            self._agents[agent] = asyncio.Semaphore(self.agent_concurrency.get(agent, self.max_concurrency))
+        return self._agents[agent]
+
+    @asynccontextmanager
+    async def guard(self, agent: str, model: str) -> AsyncIterator[None]:
+        """
+        Hold a concurrency slot for one model call and feed its outcome to the
+        model's circuit breaker. Raises Overloaded instead of queuing without bound.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Semaphores are bound to one event loop (e.g. across test clients)
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrency)
+            self._agents = {}
+        breaker = self.breaker(model)
+        probe = breaker.check(model, self._mean_seconds)
+        try:
+            async with self._slot(agent, breaker):
+                yield
+        finally:
+            if probe:
+                breaker.end_probe()
+
+    @asynccontextmanager
+    async def _slot(self, agent: str, breaker: CircuitBreaker) -> AsyncIterator[None]:
+        """Wait for an agent and a global slot, and record the call's outcome"""
+        agent_slots, global_slots = self._agent_semaphore(agent), self._global
+        if (agent_slots.locked() or global_slots.locked()) and self._queued >= self.max_queued:
+            metrics.inc("resume_policy_events_total", agent=agent, event="rejected")
+            retry_after = self._mean_seconds * (self._queued + 1) / self.max_concurrency
+            raise Overloaded("Too many analyses in progress; try again later", retry_after)
+        self._queued += 1
+        try:
+            # Per-agent slot first, so a saturated agent does not hold global slots
+            await agent_slots.acquire()
+            try:
+                await global_slots.acquire()
+            except BaseException:
+                agent_slots.release()
+                raise
+        finally:
+            self._queued -= 1
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_transient(e):
+                breaker.record_failure()
+                if breaker.state == "open":
+                    metrics.inc("resume_policy_events_total", agent=agent, event="circuit_opened")
+            raise
+        else:
+            breaker.record_success()
+            self._mean_seconds = 0.9 * self._mean_seconds + 0.1 * (time.monotonic() - start)
+        finally:
+            global_slots.release()
+            agent_slots.release()
+
+    async def call(self, agent: str, model: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run one model call under the policy, retrying transient failures with
+        jittered backoff. The deadline starts with the first attempt and
+        covers every retry and the waits between them.
+        """
+        loop = asyncio.get_running_loop()
+        deadline: Optional[float] = None
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.guard(agent, model):
+                    # Set once a slot is free, so time spent queued for the
+                    # first attempt is bounded by max_queued rather than here
+                    if deadline is None:
+                        deadline = loop.time() + self.timeout
+                    async with asyncio.timeout_at(deadline):
+                        return await fn()
+            except Exception as e:
+                remaining = self.timeout if deadline is None else deadline - loop.time()
+                if attempt == self.retries or not is_transient(e) or remaining <= 0:
+                    if isinstance(e, TimeoutError):
+                        metrics.inc("resume_policy_events_total", agent=agent, event="timeout")
+                        raise DeadlineExceeded(
+                            f"Model call did not finish within {self.timeout:g}s, retries included"
+                        ) from e
+                    raise
+                metrics.inc("resume_policy_events_total", agent=agent, event="retry")
+            await asyncio.sleep(min(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5), remaining))
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "agent_concurrency": self.agent_concurrency,
+            "queued": self._queued,
+            "breakers": {name: breaker.state for name, breaker in self._breakers.items()},
+        }
+
+
+def create_policy_from_env() -> ExecutionPolicy:
+    """
+    Build the execution policy from RESUME_* environment variables
+    """
+    agent_concurrency = {}
+    for entry in os.getenv("RESUME_AGENT_CONCURRENCY", "").split(","):
+        agent, _, limit = entry.partition("=")
+        if limit:
+            agent_concurrency[agent.strip()] = int(limit)
+    return ExecutionPolicy(
+        max_concurrency=int(os.getenv("RESUME_MAX_CONCURRENT_CALLS", "16")),
+        agent_concurrency=agent_concurrency,
+        max_queued=int(os.getenv("RESUME_MAX_QUEUED_CALLS", "64")),
+        timeout=float(os.getenv("RESUME_CALL_TIMEOUT_SECONDS", "60")),
+        retries=int(os.getenv("RESUME_CALL_RETRIES", "2")),
+        breaker_failures=int(os.getenv("RESUME_BREAKER_FAILURES", "5")),
+        breaker_reset_seconds=float(os.getenv("RESUME_BREAKER_RESET_SECONDS", "30")),
+    )
+
+
+def retry_after_header(error: PolicyError) -> Dict[str, str]:
+    if error.retry_after is None:
+        return {}
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
@@ -0,0 +1,212 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from matching import WEIGHTS, _forms, seniority_rank
+from models import CVAnalysis, JobRequirements
+
+
+@dataclass
+class RankedCandidate:
+    """A CV ranked against a vacancy, with per-category scores (0-100)."""
+    cv_id: str
+    score: float
+    skills: Optional[float]
+    languages: Optional[float]
+    qualifications: Optional[float]
+    experience: Optional[float]
+
+
+class _GrowableArray:
+    """
+    1-D NumPy array with amortized O(1) appends (capacity doubles when full)
+    """
+
+    def __init__(self, dtype):
+        self._data = np.zeros(16, dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            grown = np.zeros(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self.values
+            self._data = grown
+        self._data[self._size:needed] = values
+        self._size = needed
+
+
+class _TermMatrix:
+    """
+    Sparse CV x term incidence matrix, stored as (row, term) entries that rows
+    are appended to
+    """
+
+    def __init__(self):
+        self._indices = _GrowableArray(np.int64)
+        self._row_of_entry = _GrowableArray(np.int64)
+        self.n_rows = 0
+
+    def append(self, terms: List[str], vocabulary: Dict[str, int]) -> None:
+        columns = {vocabulary.setdefault(form, len(vocabulary)) for term in terms if term for form in _forms(term)}
+        self._indices.extend(sorted(columns))
+        self._row_of_entry.extend([self.n_rows] * len(columns))
+        self.n_rows += 1
+
+    def coverage(self, requirements: List[str], vocabulary: Dict[str, int]) -> Optional[np.ndarray]:
+        """
+        Fraction (0-100) of distinct requirements each CV covers, or None if there are none
+        """
+        # Requirement x term lookup table; a requirement matches via any of its forms
+        requirement_forms = {}
+        for requirement in requirements:
+            forms = _forms(requirement)
+            if forms:
+                requirement_forms.setdefault(min(forms), forms)
+        if not requirement_forms:
+            return None
+        lookup = np.zeros((len(vocabulary), len(requirement_forms)), dtype=bool)
+        for j, forms in enumerate(requirement_forms.values()):
+            columns = [vocabulary[form] for form in forms if form in vocabulary]
+            lookup[columns, j] = True
+
+        hits = np.zeros((self.n_rows, len(requirement_forms)), dtype=bool)
+        indices, row_of_entry = self._indices.values, self._row_of_entry.values
+        if len(indices):
+            relevant = np.flatnonzero(lookup.any(axis=1)[indices])
+            entry_rows, requirement_cols = np.nonzero(lookup[indices[relevant]])
+            hits[row_of_entry[relevant[entry_rows]], requirement_cols] = True
+        return 100.0 * hits.sum(axis=1) / len(requirement_forms)
+
+
+class CandidateIndex:
+    """
+    Index of analyzed CVs that ranks the whole corpus against a vacancy with a
+    handful of vectorized NumPy operations. Scores follow the same weighting
+    as matching.local_match, using exact normalized term matches.
+
+    Each added CV is appended as a new row, so adding never rebuilds the
+    index. A re-added or removed CV leaves a dead row behind; the rows are
+    rebuilt once dead rows outnumber live ones.
+    """
+
+    def __init__(self):
+        self._cvs: Dict[str, CVAnalysis] = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids: List[Optional[str]] = []
+        self._row: Dict[str, int] = {}
+        self._vocabulary: Dict[str, int] = {}
+        self._skills = _TermMatrix()
+        self._languages = _TermMatrix()
+        self._credentials = _TermMatrix()
+        self._seniority = _GrowableArray(np.float64)
+        self._alive = _GrowableArray(bool)
+
+    def __len__(self) -> int:
+        return len(self._cvs)
+
+    def __contains__(self, cv_id: str) -> bool:
+        return cv_id in self._cvs
+
+    def get(self, cv_id: str) -> Optional[CVAnalysis]:
+        return self._cvs.get(cv_id)
+
+    def add(self, cv_id: str, cv_analysis: CVAnalysis) -> None:
+        previous = self._cvs.get(cv_id)
+        if previous == cv_analysis:
+            return
+        if previous is not None:
+            self._kill(cv_id)
+        self._cvs[cv_id] = cv_analysis
+        self._append(cv_id, cv_analysis)
+
+    def remove(self, cv_id: str) -> None:
+        if self._cvs.pop(cv_id, None) is not None:
+            self._kill(cv_id)
+
+    def _append(self, cv_id: str, cv: CVAnalysis) -> None:
+        self._row[cv_id] = len(self._ids)
+        self._ids.append(cv_id)
+        self._skills.append(cv.skills, self._vocabulary)
+        self._languages.append(cv.languages, self._vocabulary)
+        self._credentials.append(cv.certifications + cv.skills, self._vocabulary)
+        rank = seniority_rank(cv.seniority_level)
+        self._seniority.extend([np.nan if rank is None else rank])
+        self._alive.extend([True])
+
+    def _kill(self, cv_id: str) -> None:
+        row = self._row.pop(cv_id)
+        self._ids[row] = None
+        self._alive.values[row] = False
+        if len(self._ids) - len(self._row) > max(1000, len(self._row)):
+            self._reset()
+            for live_id, cv in self._cvs.items():
+                self._append(live_id, cv)
+
+    def rank(self, job_requirements: JobRequirements, top_k: int = 20) -> List[RankedCandidate]:
+        """
+        Return the top_k CVs for the vacancy, best first
+        """
+        if not self._cvs:
+            return []
+
+        scores = {
+            "skills": self._skills.coverage(job_requirements.skills, self._vocabulary),
+            "languages": self._languages.coverage(job_requirements.languages, self._vocabulary),
+            "qualifications": self._credentials.coverage(
+                job_requirements.certifications + job_requirements.qualifications, self._vocabulary
+            ),
+            "experience": None,
+        }
+        job_rank = seniority_rank(job_requirements.seniority_level)
+        if job_rank is not None:
+            scores["experience"] = np.clip(
+                100.0 - 35.0 * np.maximum(0.0, job_rank - self._seniority.values), 0.0, 100.0
+            )
+
+        # Weighted mean over the categories that are known for each CV
+        n = len(self._ids)
+        total = np.zeros(n)
+        weight = np.zeros(n)
+        for name, values in scores.items():
+            if values is None:
+                continue
+            known = ~np.isnan(values)
+            total += np.where(known, WEIGHTS[name] * values, 0.0)
+            weight += np.where(known, WEIGHTS[name], 0.0)
+        overall = np.divide(total, weight, out=np.zeros(n), where=weight > 0)
+        # Rows of removed or replaced CVs never rank
+        overall[~self._alive.values] = -np.inf
+
+        top_k = min(top_k, len(self._cvs))
+        top = np.argpartition(-overall, top_k - 1)[:top_k]
+        top = top[np.argsort(-overall[top], kind="stable")]
+
+        def category(name: str, i: int) -> Optional[float]:
+            values = scores[name]
+            if values is None or np.isnan(values[i]):
+                return None
+            return round(float(values[i]), 1)
+
+        return [
+            RankedCandidate(
+                cv_id=self._ids[i],
+                score=round(float(overall[i]), 1),
+                skills=category("skills", i),
+                languages=category("languages", i),
+                qualifications=category("qualifications", i),
+                experience=category("experience", i),
+            )
+            for i in top
+        ]
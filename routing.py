@@ -0,0 +1,158 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from metrics import metrics
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
+
+
+@dataclass
+class Tier:
+    """One model tier; tiers are ordered from cheapest to strongest."""
+    name: str
+    model_name: str
+    # Larger inputs (prompt characters plus attachment bytes) skip this tier
+    max_input_size: Optional[int] = None
+    # OpenAI-compatible endpoint (Ollama, vLLM, llama.cpp) for a local model
+    base_url: Optional[str] = None
+
+    @property
+    def is_local(self) -> bool:
+        return self.base_url is not None
+
+    @cached_property
+    def model(self) -> "Model":
+        # Built once so every call on this tier reuses the same HTTP client
+        from pydantic_ai.models import infer_model
+
+        if self.base_url is not None:
+            from pydantic_ai.models.openai import OpenAIModel
+            from pydantic_ai.providers.openai import OpenAIProvider
+
+            provider = OpenAIProvider(base_url=self.base_url, api_key=os.getenv("RESUME_LOCAL_API_KEY", "local"))
+            return OpenAIModel(self.model_name, provider=provider)
+        return infer_model(self.model_name)
+
+    @property
+    def label(self) -> str:
+        # Used for pricing in metrics; local models have no price
+        return f"local:{self.model_name}" if self.is_local else self.model_name
+
+    def accepts(self, input_size: int, has_binary: bool) -> bool:
+        if self.max_input_size is not None and input_size > self.max_input_size:
+            return False
+        # Local models are text-only; PDFs go to a hosted tier
+        return not (self.is_local and has_binary)
+
+
+@dataclass
+class _TierStats:
+    calls: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+class ModelRouter:
+    """
+    Picks the model tiers for each agent call: the cheapest tier that fits
+    the input first, then stronger tiers if its output fails validation or
+    the caller's confidence check, or the tier itself is failing.
+    """
+
+    def __init__(self, tiers: List[Tier], start_tiers: Optional[Dict[str, str]] = None):
+        if not tiers:
+            raise ValueError("At least one model tier is required")
+        self.tiers = tiers
+        # Agent name -> first tier to try, for agents that need a stronger model
+        self.start_tiers = start_tiers or {}
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple[str, str], _TierStats] = {}
+
+    @property
+    def signature(self) -> str:
+        """
+        Identifies the tier setup in cache keys; a single tier is just its model name
+        """
+        return ",".join(tier.label for tier in self.tiers)
+
+    def plan(self, agent: str, input_size: int, has_binary: bool) -> List[Tier]:
+        """
+        Tiers to try for one call, in escalation order
+        """
+        names = [tier.name for tier in self.tiers]
+        start = names.index(self.start_tiers[agent]) if self.start_tiers.get(agent) in names else 0
+        tiers = [tier for tier in self.tiers[start:] if tier.accepts(input_size, has_binary)]
+        # Nothing fits: fall back to the strongest tier
+        return tiers or self.tiers[-1:]
+
+    def record(self, agent: str, tier: Tier, outcome: str, seconds: float) -> None:
+        """
+        Record one routing decision: 'accepted', 'escalated', 'invalid' or 'failed'
+        """
+        metrics.inc("resume_model_route_total", agent=agent, tier=tier.name, outcome=outcome)
+        metrics.observe("resume_model_tier_duration_seconds", seconds, agent=agent, tier=tier.name)
+        with self._lock:
+            stats = self._stats.setdefault((agent, tier.name), _TierStats())
+            stats.calls[outcome] = stats.calls.get(outcome, 0) + 1
+            stats.seconds += seconds
+
+    def stats(self) -> dict:
+        """
+        Tier setup plus per-agent, per-tier decision counts and mean latency
+        """
+        agents: Dict[str, dict] = {}
+        with self._lock:
+            for (agent, tier), stats in self._stats.items():
+                calls = sum(stats.calls.values())
+                agents.setdefault(agent, {})[tier] = {
+                    **stats.calls,
+                    "mean_seconds": round(stats.seconds / calls, 4) if calls else 0.0,
+                }
+        return {
+            "tiers": [
+                {"name": t.name, "model": t.model_name, "max_input_size": t.max_input_size, "local": t.is_local}
+                for t in self.tiers
+            ],
+            "start_tiers": self.start_tiers,
+            "agents": agents,
+        }
+
+
+def parse_tiers(spec: str) -> List[Tier]:
+    """
+    Parse "name=provider:model[@max_input_size],..." (cheapest first)
+    """
+    tiers = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, model = entry.partition("=")
+        model, _, limit = model.partition("@")
+        if not name or not model:
+            raise ValueError(f"Invalid model tier {entry!r}; expected name=provider:model[@max_input_size]")
+        tiers.append(Tier(name.strip(), model.strip(), int(limit) if limit else None))
+    return tiers
+
+
+def create_router_from_env(default_model: str) -> ModelRouter:
+    """
+    Build the router from RESUME_MODEL_TIERS, RESUME_LOCAL_MODEL and RESUME_AGENT_TIERS;
+    without them every call goes to default_model, as before
+    """
+    tiers = parse_tiers(os.getenv("RESUME_MODEL_TIERS", "")) or [Tier("default", default_model)]
+    local_model = os.getenv("RESUME_LOCAL_MODEL")
+    if local_model:
+        limit = os.getenv("RESUME_LOCAL_MAX_INPUT")
+        tiers.insert(0, Tier(
+            "local",
+            local_model,
+            int(limit) if limit else None,
+            os.getenv("RESUME_LOCAL_BASE_URL", "http://localhost:11434/v1"),
+        ))
+    start_tiers = {}
+    for entry in os.getenv("RESUME_AGENT_TIERS", "").split(","):
+        agent, _, tier = entry.partition("=")
+        if tier:
+            start_tiers[agent.strip()] = tier.strip()
+    return ModelRouter(tiers, start_tiers)
@@ -0,0 +1,135 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-worker locking is unavailable
+    fcntl = None
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key so only one of them does the
+    work and every caller gets the same result (or exception).
+
+    The shared work runs in its own task, so a caller that disconnects does
+    not cancel it for the others. With lock_dir set, the work also takes an
+    exclusive lock file per key, so callers in other worker processes wait for
+    it to finish and can then pick up the result from a shared cache. The
+    file is removed when the work is done.
+    """
+
+    def __init__(self, lock_dir: Optional[str | Path] = None, poll_interval: float = 0.05):
+        self.lock_dir = Path(lock_dir) if lock_dir and fcntl is not None else None
+        if self.lock_dir is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn for key, or join the call already in flight for it
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                future = asyncio.ensure_future(self._locked(key, fn))
+                self._track(key, future)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Start over if the joined call was abandoned, not if we were cancelled
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+    async def join(self, key: str) -> Optional[T]:
+        """
+        Wait for the call in flight for key; None if there is none or it was abandoned
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            return None
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled() and not asyncio.current_task().cancelling():
+                return None
+            raise
+
+    @asynccontextmanager
+    async def lead(self, key: str) -> AsyncIterator[asyncio.Future]:
+        """
+        Register the caller itself as the in-flight call for key, for work that
+        cannot run in a separate task (e.g. streaming). The caller must set the
+        yielded future's result; otherwise it is cancelled on exit, and callers
+        waiting on it start their own call.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._track(key, future)
+        try:
+            yield future
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def _track(self, key: str, future: asyncio.Future) -> None:
+        self._inflight[key] = future
+
+        def forget(done: asyncio.Future) -> None:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            # Mark the exception as retrieved even if every caller went away
+            if not done.cancelled():
+                done.exception()
+
+        future.add_done_callback(forget)
+
+    async def _locked(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        if self.lock_dir is None:
+            return await fn()
+        path = self.lock_dir / f"{key}.lock"
+        fd = await self._acquire(path)
+        try:
+            return await fn()
+        finally:
+            # Removed while still held, so the directory does not fill up with
+            # one file per key; waiters on the old file notice and start over
+            path.unlink(missing_ok=True)
+            os.close(fd)
+
+    async def _acquire(self, path: Path) -> int:
+        """
+        Open and exclusively lock path, returning the descriptor. A lock taken
+        on a file that its holder has since removed does not count.
+        """
+        while True:
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                # Poll instead of blocking so the event loop (and its threads) stay free
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(self.poll_interval)
+                try:
+                    if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                        return fd
+                except FileNotFoundError:
+                    pass
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Iterator, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from cache import ResultCache
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def analysis_id(content: bytes | str) -> str:
+    """
+    Content-addressed ID of an analyzed input (PDF bytes or vacancy text)
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class MemoryBackend:
+    """
+    In-process LRU backend bounded by entry count and TTL. Fast, but every
+    worker holds its own copy.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, namespace: str = "default") -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry[1]
+
+    def set(self, key: str, value: str, namespace: str = "default") -> None:
+        with self._lock:
+            self._entries[(namespace, key)] = (time.time(), value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def values(self, namespace: str, since: Optional[float] = None) -> Iterator[Tuple[str, str]]:
+        cutoff = max(time.time() - self.ttl_seconds, since or 0.0)
+        with self._lock:
+            items = [(key, value) for (ns, key), (created, value) in self._entries.items() if ns == namespace and created >= cutoff]
+        yield from items
+
+
+class RedisBackend:
+    """
+    Backend for any Redis-protocol server (Redis, Valkey, KeyDB, ...). TTL is
+    applied per key; size bounds and LRU eviction come from the server's
+    maxmemory / maxmemory-policy settings. A sorted set per namespace holds
+    each key's write time, so entries added since a refresh are found without
+    scanning the keyspace.
+    """
+
+    # Keys fetched per MGET when listing a namespace
+    batch_size = 500
+
+    def __init__(self, url: str, ttl_seconds: float = 7 * 24 * 3600, prefix: str = "resumechecker"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis store backend requires the 'redis' package") from e
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _name(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _created(self, namespace: str) -> str:
+        # No trailing key, so it never collides with an entry's name
+        return f"{self.prefix}:{namespace}"
+
+    def get(self, key: str, namespace: str = "default") -> Optional[str]:
+        return self._client.get(self._name(namespace, key))
+
+    def set(self, key: str, value: str, namespace: str = "default") -> None:
+        now = time.time()
+        created = self._created(namespace)
+        with self._client.pipeline() as pipe:
+            pipe.set(self._name(namespace, key), value, ex=int(self.ttl_seconds))
+            pipe.zadd(created, {key: now})
+            # Entries past their TTL have expired; drop them from the index too
+            pipe.zremrangebyscore(created, "-inf", f"({now - self.ttl_seconds}")
+            pipe.expire(created, int(self.ttl_seconds))
+            pipe.execute()
+
+    def values(self, namespace: str, since: Optional[float] = None) -> Iterator[Tuple[str, str]]:
+        if since is None:
+            # A full listing scans the keyspace, so it also finds entries
+            # written before the index existed or dropped from it by eviction
+            start = len(self._name(namespace, ""))
+            keys = (name[start:] for name in self._client.scan_iter(match=self._name(namespace, "*")))
+        else:
+            cutoff = max(time.time() - self.ttl_seconds, since)
+            keys = iter(self._client.zrangebyscore(self._created(namespace), cutoff, "+inf"))
+        while batch := list(islice(keys, self.batch_size)):
+            values = self._client.mget([self._name(namespace, key) for key in batch])
+            gone = [key for key, value in zip(batch, values) if value is None]
+            if gone and since is not None:
+                # Evicted by the server's maxmemory policy
+                self._client.zrem(self._created(namespace), *gone)
+            for key, value in zip(batch, values):
+                if value is not None:
+                    yield key, value
+
+
+class AnalysisStore:
+    """
+    Stores analyses by kind ("cv", "job", ...) and content-addressed ID
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def put(self, kind: str, analysis_id: str, analysis: BaseModel) -> None:
+        self.backend.set(analysis_id, analysis.model_dump_json(), kind)
+
+    def get(self, kind: str, analysis_id: str, model_type: Type[T]) -> Optional[T]:
+        value = self.backend.get(analysis_id, kind)
+        return None if value is None else model_type.model_validate_json(value)
+
+    def items(self, kind: str, model_type: Type[T], since: Optional[float] = None) -> Iterator[Tuple[str, T]]:
+        """Stored analyses of a kind, optionally only those stored at or after since (a Unix timestamp)"""
+        for key, value in self.backend.values(kind, since):
+            yield key, model_type.model_validate_json(value)
+
+
+def create_store_from_env(
+    name: str = "STORE", default_path: str = ".cache/analyses.sqlite3", default_max_entries: int = 10000
+) -> AnalysisStore:
+    """
+    Build the analysis store selected by RESUME_STORE_BACKEND (sqlite, memory
+    or redis). Other stores on the same backend pass their own name, and read
+    their path, size and TTL from RESUME_<name>_* settings.
+    """
+    backend_name = os.getenv("RESUME_STORE_BACKEND", "sqlite")
+    max_entries = int(os.getenv(f"RESUME_{name}_MAX_ENTRIES", str(default_max_entries)))
+    ttl_seconds = float(os.getenv(f"RESUME_{name}_TTL_SECONDS", str(30 * 24 * 3600)))
+    if backend_name == "memory":
+        backend = MemoryBackend(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    elif backend_name == "sqlite":
+        # The result cache is already a bounded SQLite LRU; reuse it on its own file
+        backend = ResultCache(
+            os.getenv(f"RESUME_{name}_PATH", default_path),
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+        )
+    elif backend_name == "redis":
+        backend = RedisBackend(
+            os.getenv("RESUME_STORE_URL", "redis://localhost:6379/0"),
+            ttl_seconds=ttl_seconds,
+            prefix="resumechecker" if name == "STORE" else f"resumechecker:{name.lower()}",
+        )
+    else:
+        raise ValueError(f"Unknown store backend: {backend_name}")
+    return AnalysisStore(backend)
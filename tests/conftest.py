@@ -0,0 +1,43 @@
+import pytest
+
+from models import CVAnalysis, JobRequirements
+
+
+def make_cv(**fields) -> CVAnalysis:
+    values = {
+        "skills": ["Python", "Django", "Postgres", "Docker"],
+        "experience_summary": "Six years of backend development.",
+        "strengths": ["API design"],
+        "weaknesses": ["Frontend"],
+        "recommendations": ["Quantify impact"],
+        "languages": ["English (fluent)", "Dutch (native)"],
+        "certifications": [],
+        "responsibilities": ["Designed payment APIs"],
+        "seniority_level": "Senior",
+    }
+    values.update(fields)
+    return CVAnalysis(**values)
+
+
+def make_job(**fields) -> JobRequirements:
+    values = {
+        "skills": ["Python", "PostgreSQL", "Docker", "AWS"],
+        "experience": "5+ years of backend development",
+        "qualifications": [],
+        "languages": ["English"],
+        "certifications": [],
+        "responsibilities": ["Build APIs"],
+        "seniority_level": "Senior",
+    }
+    values.update(fields)
+    return JobRequirements(**values)
+
+
+@pytest.fixture
+def cv():
+    return make_cv()
+
+
+@pytest.fixture
+def job():
+    return make_job()
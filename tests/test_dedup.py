@@ -0,0 +1,58 @@
+import random
+
+from dedup import Fingerprint, MinHashIndex
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def _document(rng: random.Random, length: int = 300) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def _edit(rng: random.Random, text: str, changes: int) -> str:
+    words = text.split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def test_near_duplicates_are_found():
+    rng = random.Random(0)
+    index = MinHashIndex(threshold=0.8)
+    documents = {f"doc{i}": _document(rng) for i in range(200)}
+    for doc_id, text in documents.items():
+        index.add(doc_id, index.signature(text))
+    found = 0
+    for doc_id, text in list(documents.items())[:100]:
+        match = index.query(index.signature(_edit(rng, text, 3)))
+        found += match is not None and match[0] == doc_id
+    assert found >= 95
+
+
+def test_different_documents_stay_below_the_threshold():
+    rng = random.Random(1)
+    index = MinHashIndex(threshold=0.8)
+    for i in range(200):
+        index.add(f"doc{i}", index.signature(_document(rng)))
+    assert sum(index.query(index.signature(_document(rng))) is not None for _ in range(100)) == 0
+
+
+def test_threshold_separates_light_and_heavy_edits():
+    rng = random.Random(2)
+    index = MinHashIndex(threshold=0.8)
+    text = _document(rng)
+    index.add("doc", index.signature(text))
+    assert index.query(index.signature(_edit(rng, text, 2))) is not None
+    # Replacing half the words leaves well under 80% of the shingles in common
+    assert index.query(index.signature(_edit(rng, text, 150))) is None
+
+
+def test_exclude_remove_and_fingerprint_roundtrip():
+    index = MinHashIndex()
+    signature = index.signature("Senior Python developer with Django and Postgres")
+    index.add("doc", Fingerprint.of(signature).to_signature())
+    assert index.query(signature) == ("doc", 1.0)
+    assert index.query(signature, exclude="doc") is None
+    index.remove("doc")
+    assert "doc" not in index and index.query(signature) is None
+    assert index.signature("  ...  ") is None
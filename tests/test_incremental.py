@@ -0,0 +1,71 @@
+from incremental import diff, merge_cv, split_requirements, split_sections
+from tests.conftest import make_cv
+
+CV_TEXT = """JANE DOE
+jane@example.com
+
+Experience
+Backend developer at Acme, 2018-2024.
+
+Skills
+Python, Django, Postgres
+
+Languages
+English, Dutch
+"""
+
+
+def test_first_all_caps_line_stays_in_the_header():
+    parts = split_sections(CV_TEXT).parts
+    assert list(parts) == ["header", "experience", "skills", "languages"]
+    assert parts["header"].startswith("JANE DOE")
+
+
+def test_diff_ignores_whitespace_and_case():
+    previous = split_sections(CV_TEXT)
+    current = split_sections(CV_TEXT.replace("Python, Django", "python,  django").replace("2024", "2025"))
+    changes = diff(previous, current)
+    assert list(changes.changed) == ["experience"]
+    assert set(changes.unchanged) == {"header", "skills", "languages"}
+    assert not changes.added and not changes.removed
+    assert changes.share_of(previous) == 0.25
+
+
+def test_diff_reports_added_and_removed_requirements():
+    previous = split_requirements("- Python\n- Docker\n- AWS")
+    current = split_requirements("- Python\n- Kubernetes\n- AWS")
+    changes = diff(previous, current)
+    assert list(changes.added.values()) == ["Kubernetes"]
+    assert list(changes.removed.values()) == ["Docker"]
+    assert bool(changes)
+
+
+def test_merge_keeps_fields_of_unchanged_sections():
+    previous_cv = make_cv(languages=["English", "Dutch"])
+    updated_cv = make_cv(languages=["English (fluent)", "Dutch"], skills=["Python", "Go"])
+    changes = diff(split_sections(CV_TEXT), split_sections(CV_TEXT.replace("Postgres", "Go")))
+    merged = merge_cv(previous_cv, updated_cv, changes)
+    assert merged.languages == ["English", "Dutch"]
+    assert merged.skills == ["Python", "Go"]
+
+
+def test_merge_takes_the_model_value_when_the_section_changed():
+    edited = CV_TEXT.replace("English, Dutch", "English, Dutch, German")
+    changes = diff(split_sections(CV_TEXT), split_sections(edited))
+    updated_cv = make_cv(languages=["English", "Dutch", "German"])
+    assert merge_cv(make_cv(), updated_cv, changes).languages == ["English", "Dutch", "German"]
+
+
+def test_merge_recognizes_sections_in_other_languages():
+    # An edited Dutch languages section must not be overridden by the previous languages
+    dutch = CV_TEXT.replace("Languages", "TAALEN")
+    changes = diff(split_sections(dutch), split_sections(dutch.replace("English, Dutch", "Engels")))
+    updated_cv = make_cv(languages=["English"])
+    assert merge_cv(make_cv(), updated_cv, changes).languages == ["English"]
+
+
+def test_merge_takes_the_model_value_when_the_header_changed():
+    previous = split_sections("Jane Doe\nSpeaks English\n\nSkills\nPython\n\nLanguages\nEnglish")
+    current = split_sections("Jane Doe\nSpeaks English and German\n\nSkills\nPython\n\nLanguages\nEnglish")
+    updated_cv = make_cv(languages=["English", "German"])
+    assert merge_cv(make_cv(), updated_cv, diff(previous, current)).languages == ["English", "German"]
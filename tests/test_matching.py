@@ -0,0 +1,54 @@
+import pytest
+
+from matching import local_match, normalize_term, seniority_rank
+from tests.conftest import make_cv, make_job
+
+
+@pytest.mark.parametrize("term, canonical", [
+    ("JS", "javascript"),
+    ("Postgres", "postgresql"),
+    ("k8s", "kubernetes"),
+    ("English (fluent)", "english"),
+    ("Nederlands", "dutch"),
+    ("  Python3 ", "python"),
+])
+def test_synonyms_and_qualifiers(term, canonical):
+    assert normalize_term(term) == canonical
+
+
+def test_synonyms_match_requirements(cv, job):
+    score = local_match(cv, job)
+    assert score.matched_skills == ["Python", "PostgreSQL", "Docker"]
+    assert score.missing_requirements == ["AWS"]
+    assert score.matched_languages == ["English"]
+    assert score.skills_match == 75
+
+
+@pytest.mark.parametrize("cv_skill, requirement, matched", [
+    # A more specific CV term satisfies the requirement it contains
+    ("Python programming", "Python", True),
+    ("AWS Certified Developer", "AWS", True),
+    # A generic CV term does not satisfy a more specific requirement
+    ("Management", "Product management", False),
+    ("Data", "Big data", False),
+    # Words end at spaces, slashes and commas only
+    ("Go-to-market strategy", "Go", False),
+    ("ASP.NET", "ASP", False),
+    ("Python/Django", "Django", True),
+])
+def test_word_boundaries(cv_skill, requirement, matched):
+    score = local_match(make_cv(skills=[cv_skill]), make_job(skills=[requirement]))
+    assert (score.matched_skills == [requirement]) is matched
+
+
+def test_duplicate_requirements_count_once():
+    score = local_match(make_cv(skills=["Python"]), make_job(skills=["Python", " python ", "Py"]))
+    assert score.matched_skills == ["Python"]
+    assert score.skills_match == 100
+
+
+def test_seniority_gap_lowers_experience_match():
+    assert seniority_rank("Senior Engineer") == 3
+    assert seniority_rank("Not specified") is None
+    score = local_match(make_cv(seniority_level="Junior"), make_job(seniority_level="Senior"))
+    assert score.experience_match == 30
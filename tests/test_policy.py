@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from policy import CircuitOpen, DeadlineExceeded, ExecutionPolicy, Overloaded, is_transient
+
+# is_transient imports the model client stack on first use; keep that out of the timed tests
+is_transient(ValueError())
+
+
+async def _fail():
+    raise httpx.ConnectError("provider unreachable")
+
+
+def test_deadline_covers_retries():
+    policy = ExecutionPolicy(timeout=0.3, retries=5, backoff=0.05)
+    calls = 0
+
+    async def slow_failure():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        raise httpx.ConnectError("provider unreachable")
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(policy.call("scoring", "model", slow_failure))
+    assert time.monotonic() - start < 0.5
+    assert calls == 2
+
+
+def test_transient_failures_are_retried():
+    policy = ExecutionPolicy(retries=2, backoff=0.01)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("provider unreachable")
+        return "ok"
+
+    assert asyncio.run(policy.call("scoring", "model", flaky)) == "ok"
+    assert len(attempts) == 3
+
+
+def test_overload_rejects_instead_of_queuing():
+    policy = ExecutionPolicy(max_concurrency=1, max_queued=1)
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*(policy.call("scoring", "model", slow) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert results[:2] == ["ok", "ok"]
+    assert isinstance(results[2], Overloaded)
+    assert results[2].retry_after > 0
+
+
+def test_breaker_opens_and_fails_fast():
+    policy = ExecutionPolicy(retries=0, breaker_failures=2, breaker_reset_seconds=30)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await policy.call("scoring", "model", _fail)
+        with pytest.raises(CircuitOpen) as error:
+            await policy.call("scoring", "model", _fail)
+        return error.value
+
+    error = asyncio.run(main())
+    assert 0 < error.retry_after <= 30
+    assert policy.breaker("model").state == "open"
+    # Other models keep their own breaker
+    assert policy.breaker("other").state == "closed"
+
+
+def test_half_open_breaker_lets_a_single_probe_through():
+    policy = ExecutionPolicy(retries=0, breaker_failures=1, breaker_reset_seconds=0.05)
+    calls = 0
+
+    async def probe():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        with pytest.raises(httpx.ConnectError):
+            await policy.call("scoring", "model", _fail)
+        await asyncio.sleep(0.06)
+        return await asyncio.gather(*(policy.call("scoring", "model", probe) for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert results[0] == "ok"
+    assert all(isinstance(result, CircuitOpen) for result in results[1:])
+    assert policy.breaker("model").state == "closed"
+
+
+def test_failed_probe_reopens_the_breaker():
+    policy = ExecutionPolicy(retries=0, breaker_failures=3, breaker_reset_seconds=0.05)
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError):
+                await policy.call("scoring", "model", _fail)
+        await asyncio.sleep(0.06)
+        assert policy.breaker("model").state == "half_open"
+        with pytest.raises(httpx.ConnectError):
+            await policy.call("scoring", "model", _fail)
+
+    asyncio.run(main())
+    assert policy.breaker("model").state == "open"
+
+
+def test_probe_without_verdict_hands_over_to_the_next_call():
+    policy = ExecutionPolicy(retries=0, breaker_failures=1, breaker_reset_seconds=0.05)
+
+    async def invalid():
+        raise ValueError("not a provider failure")
+
+    async def ok():
+        return "ok"
+
+    async def main():
+        with pytest.raises(httpx.ConnectError):
+            await policy.call("scoring", "model", _fail)
+        await asyncio.sleep(0.06)
+        with pytest.raises(ValueError):
+            await policy.call("scoring", "model", invalid)
+        return await policy.call("scoring", "model", ok)
+
+    assert asyncio.run(main()) == "ok"
+    assert policy.breaker("model").state == "closed"
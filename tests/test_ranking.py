@@ -0,0 +1,62 @@
+import random
+
+from matching import local_match
+from ranking import CandidateIndex
+from tests.conftest import make_cv, make_job
+
+SKILLS = ["Python", "Django", "Postgres", "Docker", "Kubernetes", "AWS", "Go", "React", "JS", "Terraform"]
+LANGUAGES = ["English", "Dutch (native)", "German", "French"]
+LEVELS = ["Junior", "Medior", "Senior", "Lead", None]
+
+
+def _corpus(n: int = 200):
+    rng = random.Random(0)
+    return {
+        f"cv{i}": make_cv(
+            skills=rng.sample(SKILLS, rng.randint(1, 6)),
+            languages=rng.sample(LANGUAGES, rng.randint(0, 2)),
+            certifications=rng.sample(["AWS Certified Developer", "CKA"], rng.randint(0, 1)),
+            seniority_level=rng.choice(LEVELS),
+        )
+        for i in range(n)
+    }
+
+
+def test_rank_agrees_with_local_match():
+    cvs = _corpus()
+    index = CandidateIndex()
+    for cv_id, cv in cvs.items():
+        index.add(cv_id, cv)
+    job = make_job(certifications=["AWS Certified Developer"], languages=["English", "Dutch"])
+    ranked = index.rank(job, top_k=len(cvs))
+    assert len(ranked) == len(cvs)
+    for candidate in ranked:
+        assert abs(candidate.score - local_match(cvs[candidate.cv_id], job).overall_score) <= 0.5
+    scores = [candidate.score for candidate in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_top_k_holds_the_best_candidates():
+    cvs = _corpus()
+    index = CandidateIndex()
+    for cv_id, cv in cvs.items():
+        index.add(cv_id, cv)
+    job = make_job()
+    top = index.rank(job, top_k=10)
+    best = sorted((local_match(cv, job).overall_score for cv in cvs.values()), reverse=True)
+    assert len(top) == 10
+    assert min(candidate.score for candidate in top) >= best[9] - 0.5
+
+
+def test_replaced_and_removed_cvs():
+    index = CandidateIndex()
+    index.add("a", make_cv(skills=["Go"]))
+    index.add("b", make_cv(skills=["Python"]))
+    job = make_job(skills=["Python"])
+    assert [c.cv_id for c in index.rank(job)] == ["b", "a"]
+    index.add("a", make_cv(skills=["Python", "Docker"]))
+    index.remove("b")
+    ranked = index.rank(job)
+    assert [c.cv_id for c in ranked] == ["a"]
+    assert ranked[0].skills == 100.0
+    assert len(index) == 1
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight, fcntl
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == 1
+    assert "key" not in flight
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def main():
+        return await asyncio.gather(flight.do("a", _value("a")), flight.do("b", _value("b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+
+
+def _value(value):
+    async def work():
+        await asyncio.sleep(0.01)
+        return value
+    return work
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_work():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_join_without_call_in_flight():
+    assert asyncio.run(SingleFlight().join("key")) is None
+
+
+@pytest.mark.skipif(fcntl is None, reason="lock files need fcntl")
+def test_lock_file_serializes_workers_and_is_removed(tmp_path):
+    # Two instances stand in for two worker processes sharing the lock directory
+    first, second = SingleFlight(tmp_path), SingleFlight(tmp_path, poll_interval=0.01)
+    events = []
+
+    def work(name):
+        async def run():
+            events.append(f"{name} start")
+            await asyncio.sleep(0.05)
+            events.append(f"{name} end")
+            return name
+        return run
+
+    async def main():
+        leader = asyncio.create_task(first.do("key", work("first")))
+        await asyncio.sleep(0.01)
+        assert (tmp_path / "key.lock").exists()
+        return await asyncio.gather(leader, second.do("key", work("second")))
+
+    assert asyncio.run(main()) == ["first", "second"]
+    assert events == ["first start", "first end", "second start", "second end"]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,9 @@
+from argparse import Namespace
+
+import benchmark
+
+
+def test_import_stays_within_budget_and_defers_heavy_modules():
+    result = benchmark.run_startup(Namespace(runs=3, budget=1.0))
+    assert result.eager_imports == "-"
+    assert result.median_ms <= result.budget_ms